@@ -0,0 +1,64 @@
+"""
+Gunicorn configuration for the Filter Bag Specification System
+"""
+
+import multiprocessing
+import os
+
+# Import the app once in the master and fork workers from it, so module
+# loading and template parsing are shared copy-on-write between workers
+preload_app = True
+
+# Threaded workers: mail/SMTP calls block on I/O, not CPU.
+#
+# A few processes with many threads, not cpu*2+1 processes: with the default
+# SQLite database every process is one more writer on the same file (WAL and a
+# busy timeout are set on each connection, but writes still queue). Raise
+# WEB_CONCURRENCY freely on PostgreSQL.
+#
+# Each process keeps its own in-memory caches, so memory grows per worker:
+# rendered form pages and submission cards (keyed on row versions read from the
+# database, so never stale), the size index (SIZE_INDEX_TTL), /api/stats
+# (STATS_CACHE_TTL) and the live-update change feed (other workers' changes are
+# picked up on the next SSE_POLL_INTERVAL poll). Until then a worker that did
+# not make a change can serve slightly older suggestions, stats and events.
+#
+# Every open live-update stream (/api/submissions/stream) holds one thread for
+# up to SSE_MAX_DURATION seconds, so size threads for the number of dashboard
+# tabs on top of normal traffic.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(2, multiprocessing.cpu_count())))
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+
+# Give the mail executor time to drain before the worker is killed
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Recycle workers now and then to keep memory per worker bounded
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+
+def on_starting(server):
+    """Run the schema check once in the master instead of in every worker"""
+    if os.environ.get("SKIP_DB_INIT", "").strip().lower() in ('1', 'true', 'yes'):
+        return
+    from filter_bag_app import app, init_db
+    init_db(app)
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master - each worker opens its own"""
+    from filter_bag_app import app, db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """Flush mail still queued in the in-process executor before the worker exits"""
+    try:
+        from filter_bag_app import mail_executor
+    except ImportError:
+        return
+    if mail_executor.enabled:
+        mail_executor.drain()
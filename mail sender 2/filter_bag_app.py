@@ -4,43 +4,304 @@ Author: Claude
 Features: Email sender, Form receiver, Database storage with SQLAlchemy, PO Number Management, MULTIPLE BAGS SUPPORT
 """
 
-from flask import Flask, render_template_string, request, jsonify, url_for
+from flask import Flask, Blueprint, current_app, g, render_template_string, stream_template_string, make_response, stream_with_context, request, jsonify, url_for, copy_current_request_context, has_request_context
+from flask.cli import with_appcontext
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
+from markupsafe import Markup
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import inspect, text, or_, and_, event, true
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import sqlite as sqlite_dialect, postgresql as postgresql_dialect
+from datetime import datetime, timedelta, date
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import secrets
+import re
+import random
+import hashlib
 import os
+import threading
+import time
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+import gzip
+import bisect
+import csv
+import io
+import click
 from dotenv import load_dotenv
 
+try:
+    import orjson  # optional: faster JSON for /api/submissions
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
 
-# Initialize Flask App
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///filter_bags.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# ==================== CONFIGURATION ====================
+
+def _env_bool(name, default='false'):
+    return os.environ.get(name, default).strip().lower() in ('1', 'true', 'yes')
+
+
+class Config:
+    """Application settings, all overridable from the environment"""
+
+    SECRET_KEY = os.environ.get("SECRET_KEY", 'your-secret-key-here-change-in-production')
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", 'sqlite:///filter_bags.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite only: milliseconds a writer waits for another process's lock before "database is locked"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+    # Request size limits for form submissions
+    MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", str(64 * 1024)))
+    MAX_BAGS_PER_SUBMISSION = int(os.environ.get("MAX_BAGS_PER_SUBMISSION", "20"))
+    MAX_DRAFT_SIZE = int(os.environ.get("MAX_DRAFT_SIZE", str(32 * 1024)))
+
+    # SMTP Configuration
+    SMTP_SERVER = os.environ.get("SMTP_SERVER", 'smtp.gmail.com')
+    SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+    SENDER_EMAIL = os.environ.get("SENDER_EMAIL")
+    SENDER_PASSWORD = os.environ.get("SENDER_PASSWORD")
+    SMTP_TIMEOUT = int(os.environ.get("SMTP_TIMEOUT", "30"))
+
+    # Optional list of sending accounts, as JSON:
+    # [{"host": "smtp.gmail.com", "port": 587, "username": "a@x.com", "password": "...",
+    #   "from": "a@x.com", "weight": 2, "daily_quota": 500}, ...]
+    # When unset, SMTP_SERVER/SMTP_PORT/SENDER_EMAIL/SENDER_PASSWORD form a single account.
+    SMTP_ACCOUNTS = os.environ.get("SMTP_ACCOUNTS", "")
+    SMTP_DAILY_QUOTA = int(os.environ.get("SMTP_DAILY_QUOTA", "500"))
+    # Seconds an account is skipped after a connection/auth error
+    SMTP_FAILURE_COOLDOWN = int(os.environ.get("SMTP_FAILURE_COOLDOWN", "300"))
+
+    # Admin Notification Configuration
+    # 'immediate' = one email per submission, 'digest' = consolidated email every N minutes / N submissions
+    ADMIN_NOTIFY_MODE = os.environ.get("ADMIN_NOTIFY_MODE", "immediate").strip().lower()
+    DIGEST_INTERVAL_MINUTES = int(os.environ.get("DIGEST_INTERVAL_MINUTES", "30"))
+    DIGEST_MAX_PENDING = int(os.environ.get("DIGEST_MAX_PENDING", "20"))
+    # Seconds between background checks for a digest that is due (0 = only on submit / flush-digest)
+    DIGEST_CHECK_INTERVAL = int(os.environ.get("DIGEST_CHECK_INTERVAL", "60"))
+    # Comma separated PO numbers that always notify immediately, even in digest mode
+    URGENT_PO_NUMBERS = frozenset(
+        po.strip() for po in os.environ.get("URGENT_PO_NUMBERS", "").split(",") if po.strip()
+    )
+
+    # Background Mail Executor (for deployments without a separate worker process)
+    MAIL_EXECUTOR_ENABLED = _env_bool("MAIL_EXECUTOR_ENABLED")
+    MAIL_EXECUTOR_WORKERS = int(os.environ.get("MAIL_EXECUTOR_WORKERS", "4"))
+    MAIL_QUEUE_SIZE = int(os.environ.get("MAIL_QUEUE_SIZE", "100"))
+    MAIL_DRAIN_TIMEOUT = int(os.environ.get("MAIL_DRAIN_TIMEOUT", "25"))
+
+    # Rendered /form/<token> pages kept in memory per worker
+    FORM_PAGE_CACHE_SIZE = int(os.environ.get("FORM_PAGE_CACHE_SIZE", "256"))
+    # Rendered /submissions cards kept in memory per worker
+    CARD_CACHE_SIZE = int(os.environ.get("CARD_CACHE_SIZE", "5000"))
+
+    # Unsubmitted form links expire after this many hours (0 = never)
+    TOKEN_TTL_HOURS = int(os.environ.get("TOKEN_TTL_HOURS", "720"))
+    # Submitted specifications can be edited for this many hours after the first submit (0 = always)
+    EDIT_WINDOW_HOURS = int(os.environ.get("EDIT_WINDOW_HOURS", os.environ.get("TOKEN_TTL_HOURS", "720")))
+    PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE", "500"))
+
+    # Logging: default level plus per-logger overrides, e.g. "filter_bag_app.mail=DEBUG,werkzeug=WARNING"
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+    LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
+
+    # Readiness checks run in a background thread; probes only read the cached result
+    HEALTH_CHECK_INTERVAL = int(os.environ.get("HEALTH_CHECK_INTERVAL", "30"))
+    HEALTH_CHECK_SMTP = _env_bool("HEALTH_CHECK_SMTP", "true")
+    # The SMTP probe opens a connection per server from every worker - run it less often than the DB check
+    HEALTH_CHECK_SMTP_INTERVAL = int(os.environ.get("HEALTH_CHECK_SMTP_INTERVAL", "300"))
+    HEALTH_CHECK_TIMEOUT = int(os.environ.get("HEALTH_CHECK_TIMEOUT", "5"))
+
+    # Seconds /api/stats answers from memory before re-reading the counters
+    STATS_CACHE_TTL = int(os.environ.get("STATS_CACHE_TTL", "30"))
+
+    # Seconds before a worker re-reads bag_sizes for autocomplete (picks up other workers' edits)
+    SIZE_INDEX_TTL = int(os.environ.get("SIZE_INDEX_TTL", "300"))
+
+    # Submitted rows older than this move to filter_bag_submissions_archive
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "365"))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "500"))
+
+    # Live dashboard (Server-Sent Events): how often each stream checks submission_changes for
+    # other workers' writes, keep-alive interval, and how long one stream lives before the
+    # browser reconnects. Each open stream holds a gthread worker thread for that long, so
+    # streams are kept short (long-poll style) and resume from Last-Event-ID without losing
+    # events; allow one thread per open dashboard tab when sizing GUNICORN_THREADS.
+    SSE_POLL_INTERVAL = float(os.environ.get("SSE_POLL_INTERVAL", "2"))
+    SSE_HEARTBEAT_INTERVAL = int(os.environ.get("SSE_HEARTBEAT_INTERVAL", "15"))
+    SSE_MAX_DURATION = int(os.environ.get("SSE_MAX_DURATION", "25"))
+    SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", "1000"))
+    # Change log rows older than this are removed by purge-expired
+    CHANGE_LOG_RETENTION_HOURS = int(os.environ.get("CHANGE_LOG_RETENTION_HOURS", "24"))
+
+
+# ==================== LOGGING ====================
+
+logger = logging.getLogger('filter_bag_app')
+mail_logger = logging.getLogger('filter_bag_app.mail')
+http_logger = logging.getLogger('filter_bag_app.http')
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the request fields attached by RequestContextFilter"""
+
+    CONTEXT_FIELDS = ('request_id', 'route', 'method', 'token_prefix', 'status', 'duration_ms')
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in self.CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach request id, route and token prefix while still on the request thread"""
+
+    def filter(self, record):
+        if has_request_context():
+            if getattr(record, 'request_id', None) is None:
+                record.request_id = g.get('request_id')
+            if getattr(record, 'route', None) is None:
+                record.route = request.url_rule.rule if request.url_rule else request.path
+            token = (request.view_args or {}).get('token')
+            if token and getattr(record, 'token_prefix', None) is None:
+                record.token_prefix = token[:8]
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """Hands records to the listener thread without formatting them on the request thread"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_log_handler = None
+_log_listener = None
+
+
+def _start_log_listener():
+    """(Re)start the listener thread - also called in forked workers, where threads don't survive"""
+    global _log_listener
+    log_queue = queue.SimpleQueue()
+    _log_handler.queue = log_queue
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _log_listener = QueueListener(log_queue, output)
+    _log_listener.start()
+
+
+def _stop_log_listener():
+    if _log_listener is not None:
+        _log_listener.stop()
+
+
+def setup_logging(app):
+    """Route all logging through a queue so request threads never block on log I/O"""
+    global _log_handler
+
+    root = logging.getLogger()
+    root.setLevel(app.config['LOG_LEVEL'])
+    for item in app.config['LOG_LEVELS'].split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    if _log_handler is not None:
+        return
+
+    _log_handler = ContextQueueHandler(queue.SimpleQueue())
+    _log_handler.addFilter(RequestContextFilter())
+    root.addHandler(_log_handler)
+
+    _start_log_listener()
+    atexit.register(_stop_log_listener)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_start_log_listener)
+
+
+def start_request_timer():
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+    g.request_started = time.monotonic()
+
+
+def log_request(response):
+    started = g.get('request_started')
+    duration_ms = round((time.monotonic() - started) * 1000, 2) if started else None
+    http_logger.info(
+        'request completed',
+        extra={'method': request.method, 'status': response.status_code, 'duration_ms': duration_ms}
+    )
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    return response
+
+
+def isoformat_utc(value):
+    """ISO 8601 for API output; stored datetimes are naive UTC, so they get a "Z" suffix"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat() + 'Z'
+    return value.isoformat()
+
+
+class UtcJSONProvider(DefaultJSONProvider):
+    """jsonify() with isoformat_utc() dates instead of Flask's default HTTP dates"""
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, date):
+            return isoformat_utc(value)
+        return DefaultJSONProvider.default(value)
+
 
-# Initialize Database
-db = SQLAlchemy(app)
+# Initialize Database (bound to the app in create_app)
+db = SQLAlchemy()
 
-# SMTP Configuration
-SMTP_SERVER = 'smtp.gmail.com'
-SMTP_PORT = 587
-SENDER_EMAIL = os.environ.get("SENDER_EMAIL")
-SENDER_PASSWORD = os.environ.get("SENDER_PASSWORD")
+# All routes live on this blueprint so the app can be built by create_app()
+bp = Blueprint('main', __name__)
 
 # ==================== DATABASE MODELS ====================
 
-class FilterBagSubmission(db.Model):
-    __tablename__ = 'filter_bag_submissions'
-    
+class SubmissionColumns:
+    """Columns shared by the live submissions table and its archive"""
+
     id = db.Column(db.Integer, primary_key=True)
     token = db.Column(db.String(100), nullable=False, index=True)
     recipient_email = db.Column(db.String(200), nullable=False)
-    po_number = db.Column(db.String(100))
+    po_number = db.Column(db.String(100), index=True)
     
     # Bag Type
     bag_type = db.Column(db.String(50))
@@ -71,10 +332,97 @@ class FilterBagSubmission(db.Model):
     admin_quantity = db.Column(db.Integer)
     admin_size = db.Column(db.String(200))
 
+    # Token expiry (NULL on older rows = created_at + TOKEN_TTL_HOURS)
+    expires_at = db.Column(db.DateTime, index=True)
+
+    # Idempotency-Key of the POST that submitted this request (parent rows only)
+    idempotency_key = db.Column(db.String(64))
+
+    # Latest entry in submission_revisions for this token (parent rows only, 0 = none)
+    current_revision = db.Column(db.Integer, default=0)
+
+    # Admin bulk actions on pending requests (parent rows only)
+    revoked_at = db.Column(db.DateTime)
+    reminded_at = db.Column(db.DateTime)
+    reminder_count = db.Column(db.Integer, default=0)
+
+    # Dimensions above parsed to millimetres (see parse_dimension_mm), for range queries
+    collar_od_mm = db.Column(db.Float, index=True)
+    collar_id_mm = db.Column(db.Float, index=True)
+    tubesheet_dia_mm = db.Column(db.Float, index=True)
+    admin_size_mm = db.Column(db.Float, index=True)
+
+
+class FilterBagSubmission(SubmissionColumns, db.Model):
+    __tablename__ = 'filter_bag_submissions'
+
+    __table_args__ = (
+        # Lets the purge job find old pending rows without scanning submitted ones
+        db.Index('ix_filter_bag_submissions_submitted_created_at', 'submitted', 'created_at'),
+        # Lets the archive job find old submitted rows
+        db.Index('ix_filter_bag_submissions_submitted_submitted_at', 'submitted', 'submitted_at'),
+    )
+
     def __repr__(self):
         return f'<Submission {self.id} - {self.recipient_email}>'
 
 
+class FilterBagSubmissionArchive(SubmissionColumns, db.Model):
+    """Cold storage for old submitted rows - ids are kept from the live table"""
+    __tablename__ = 'filter_bag_submissions_archive'
+
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ArchivedSubmission {self.id} - {self.recipient_email}>'
+
+
+class SubmissionRevision(db.Model):
+    """Append-only history of the bag specifications submitted for a token"""
+    __tablename__ = 'submission_revisions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(100), nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    bags = db.Column(db.Text, nullable=False)  # compact JSON list of bag specs
+    remarks = db.Column(db.Text)
+    idempotency_key = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('token', 'revision', name='uq_submission_revisions_token_revision'),
+    )
+
+    def __repr__(self):
+        return f'<SubmissionRevision {self.token[:8]} r{self.revision}>'
+
+
+class SubmissionChange(db.Model):
+    """Append-only log of tokens whose dashboard cards changed; its id is the SSE event cursor"""
+    __tablename__ = 'submission_changes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # created / submitted / resubmitted / removed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<SubmissionChange {self.id} {self.kind} {self.token[:8]}>'
+
+
+class FormDraft(db.Model):
+    """Autosaved, not yet submitted form state for a token (one row per token)"""
+    __tablename__ = 'form_drafts'
+
+    token = db.Column(db.String(100), primary_key=True)
+    data = db.Column(db.Text, nullable=False)  # compact JSON: client_name, global_remarks, bags{n: spec}
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FormDraft {self.token[:8]} v{self.version}>'
+
+
 class BagSize(db.Model):
     __tablename__ = 'bag_sizes'
     
@@ -82,82 +430,688 @@ class BagSize(db.Model):
     size_name = db.Column(db.String(100), nullable=False)
     bag_type = db.Column(db.String(50), nullable=False)  # collar, snap, ring
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # An index rather than a constraint so upgrade_schema() adds it to existing databases
+        db.Index('uq_bag_sizes_size_name_bag_type', 'size_name', 'bag_type', unique=True),
+    )
     
     def __repr__(self):
         return f'<BagSize {self.size_name} - {self.bag_type}>'
 
-# Create tables
-with app.app_context():
-    db.create_all()
+
+class SmtpUsage(db.Model):
+    __tablename__ = 'smtp_usage'
+
+    id = db.Column(db.Integer, primary_key=True)
+    account = db.Column(db.String(200), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    sent = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('account', 'day', name='uq_smtp_usage_account_day'),
+    )
+
+    def __repr__(self):
+        return f'<SmtpUsage {self.account} {self.day}: {self.sent}>'
+
+
+class StatCounter(db.Model):
+    """Incrementally maintained dashboard counters, e.g. ('bag_type', 'collar') -> 42"""
+    __tablename__ = 'stat_counters'
+
+    id = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(200), nullable=False)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('metric', 'key', name='uq_stat_counters_metric_key'),
+    )
+
+    def __repr__(self):
+        return f'<StatCounter {self.metric}:{self.key} = {self.value}>'
+
+
+class PendingNotification(db.Model):
+    __tablename__ = 'pending_notifications'
+
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('filter_bag_submissions.id'), nullable=False)
+    po_number = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<PendingNotification {self.submission_id} - {self.po_number}>'
+
+
+class PoSummary(db.Model):
+    """Stored roll-up of one purchase order, recomputed by refresh_po_summary() when its rows change"""
+    __tablename__ = 'po_summaries'
+
+    po_number = db.Column(db.String(100), primary_key=True)
+    request_count = db.Column(db.Integer, nullable=False, default=0)
+    submitted_count = db.Column(db.Integer, nullable=False, default=0)
+    bag_count = db.Column(db.Integer, nullable=False, default=0)
+    admin_quantity_total = db.Column(db.Integer, nullable=False, default=0)
+    bag_types = db.Column(db.Text, nullable=False, default='{}')  # JSON {bag_type: count}
+    first_sent_at = db.Column(db.DateTime)
+    last_submitted_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PoSummary {self.po_number}: {self.submitted_count}/{self.request_count}>'
+
+
+def configure_sqlite(app):
+    """WAL journal and a busy timeout on every SQLite connection, so several workers can share the file.
+
+    WAL lets readers run alongside the single writer; the timeout makes a second writer wait
+    instead of failing straight away with "database is locked".
+    """
+    busy_timeout = int(app.config['SQLITE_BUSY_TIMEOUT_MS'])
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f'PRAGMA busy_timeout = {busy_timeout}')
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('PRAGMA synchronous = NORMAL')
+        finally:
+            cursor.close()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', on_connect)
+
+
+def init_db(app):
+    """Create missing tables - run once per deploy (release step / gunicorn master), not per worker"""
+    with app.app_context():
+        new_counters = not inspect(db.engine).has_table(StatCounter.__tablename__)
+        db.create_all()
+        dedupe_bag_sizes()
+        upgrade_schema()
+        setup_search_index()
+        if new_counters:
+            # Rows written before the counters existed are counted once, like the search index
+            rebuild_counters()
+
+
+def dedupe_bag_sizes():
+    """Drop duplicate (size_name, bag_type) rows, keeping the oldest, so the unique index can be built"""
+    existing_indexes = {i['name'] for i in inspect(db.engine).get_indexes(BagSize.__tablename__)}
+    if 'uq_bag_sizes_size_name_bag_type' in existing_indexes:
+        return
+
+    keep_ids = db.session.query(db.func.min(BagSize.id)).group_by(BagSize.size_name, BagSize.bag_type)
+    removed = BagSize.query.filter(BagSize.id.not_in(keep_ids)).delete(synchronize_session=False)
+    db.session.commit()
+    if removed:
+        logger.info("Removed %d duplicate bag size(s)", removed)
+
+
+def upgrade_schema():
+    """Add columns and indexes that were added to the models after a table was first created"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_columns = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        db.session.commit()
+
+        existing_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(db.engine)
+
+
+def archive_submissions(older_than_days, batch_size=500, pause=0.05):
+    """Move submitted rows older than the cutoff into the archive table, one short transaction per batch.
+
+    Returns the number of rows moved.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    column_names = [c.name for c in FilterBagSubmission.__table__.columns]
+    archive_table = FilterBagSubmissionArchive.__table__
+    live_table = FilterBagSubmission.__table__
+
+    moved = 0
+    while True:
+        rows = db.session.query(FilterBagSubmission.id, FilterBagSubmission.token, FilterBagSubmission.po_number).filter(
+            FilterBagSubmission.submitted == True,
+            FilterBagSubmission.submitted_at < cutoff
+        ).order_by(FilterBagSubmission.id).limit(batch_size).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+
+        now = datetime.utcnow()
+        db.session.execute(
+            archive_table.insert().from_select(
+                column_names + ['archived_at'],
+                db.select(*[live_table.c[name] for name in column_names], db.literal(now))
+                .where(live_table.c.id.in_(ids))
+            )
+        )
+        db.session.execute(live_table.delete().where(live_table.c.id.in_(ids)))
+        change_feed.record_many({row.token for row in rows}, 'removed')
+        # PO roll-ups count archived rows too, so moving rows leaves them unchanged
+        db.session.commit()
+
+        moved += len(ids)
+        if pause:
+            time.sleep(pause)
+
+    return moved
+
+
+# Columns covered by the full-text index, in index order
+SEARCH_COLUMNS = (
+    'client_name', 'client_email', 'recipient_email', 'po_number',
+    'admin_size', 'tubesheet_data', 'remarks'
+)
+# bm25 weights per column - names and PO numbers rank above free text
+SEARCH_WEIGHTS = (6.0, 4.0, 3.0, 6.0, 2.0, 1.0, 1.0)
+
+
+def setup_search_index():
+    """Create the FTS5 index over filter_bag_submissions and the triggers keeping it in sync (SQLite only)"""
+    if db.engine.dialect.name != 'sqlite':
+        return
+
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{c}' for c in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{c}' for c in SEARCH_COLUMNS)
+    is_new = not inspect(db.engine).has_table('filter_bag_submissions_fts')
+
+    statements = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS filter_bag_submissions_fts USING fts5(
+                {columns},
+                content='filter_bag_submissions', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )""",
+        f"""CREATE TRIGGER IF NOT EXISTS filter_bag_submissions_fts_ai AFTER INSERT ON filter_bag_submissions BEGIN
+                INSERT INTO filter_bag_submissions_fts(rowid, {columns}) VALUES (new.id, {new_values});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS filter_bag_submissions_fts_ad AFTER DELETE ON filter_bag_submissions BEGIN
+                INSERT INTO filter_bag_submissions_fts(filter_bag_submissions_fts, rowid, {columns})
+                VALUES ('delete', old.id, {old_values});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS filter_bag_submissions_fts_au AFTER UPDATE OF {columns} ON filter_bag_submissions BEGIN
+                INSERT INTO filter_bag_submissions_fts(filter_bag_submissions_fts, rowid, {columns})
+                VALUES ('delete', old.id, {old_values});
+                INSERT INTO filter_bag_submissions_fts(rowid, {columns}) VALUES (new.id, {new_values});
+            END""",
+    ]
+    for statement in statements:
+        db.session.execute(text(statement))
+    if is_new:
+        # Index rows that existed before the search table
+        db.session.execute(text("INSERT INTO filter_bag_submissions_fts(filter_bag_submissions_fts) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def like_pattern(term):
+    """``%term%`` for ILIKE with the wildcards in ``term`` escaped (use with escape='\\')"""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def build_fts_query(raw_query):
+    """Turn user input into a safe FTS5 query: every word must match, as a prefix"""
+    terms = re.findall(r'\w+', raw_query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def token_expires_at(submission):
+    """When an unsubmitted form link stops working (None = never)"""
+    if submission.expires_at:
+        return submission.expires_at
+    ttl_hours = current_app.config['TOKEN_TTL_HOURS']
+    if ttl_hours <= 0 or not submission.created_at:
+        return None
+    return submission.created_at + timedelta(hours=ttl_hours)
+
+
+def is_token_expired(submission):
+    if submission.submitted:
+        return False
+    expires_at = token_expires_at(submission)
+    return expires_at is not None and expires_at <= datetime.utcnow()
+
+
+def edit_window_closed(submission):
+    """True once a submitted request can no longer be edited (EDIT_WINDOW_HOURS after its first submit)"""
+    if not submission.submitted:
+        return False
+    window_hours = current_app.config['EDIT_WINDOW_HOURS']
+    if window_hours <= 0:
+        return False
+    first_submitted_at = db.session.query(db.func.min(SubmissionRevision.created_at)).filter(
+        SubmissionRevision.token == submission.token
+    ).scalar() or submission.submitted_at
+    return first_submitted_at is not None and first_submitted_at + timedelta(hours=window_hours) <= datetime.utcnow()
+
+
+def new_token_expiry():
+    ttl_hours = current_app.config['TOKEN_TTL_HOURS']
+    return datetime.utcnow() + timedelta(hours=ttl_hours) if ttl_hours > 0 else None
+
+
+def token_expired_condition(now):
+    """SQL version of is_token_expired() for unsubmitted rows"""
+    expired = FilterBagSubmission.expires_at < now
+    ttl_hours = current_app.config['TOKEN_TTL_HOURS']
+    if ttl_hours > 0:
+        expired = or_(expired, and_(
+            FilterBagSubmission.expires_at.is_(None),
+            FilterBagSubmission.created_at < now - timedelta(hours=ttl_hours)
+        ))
+    return expired
+
+
+def token_live_condition(now):
+    """Negation of token_expired_condition() that also holds for rows without expires_at"""
+    no_expiry = FilterBagSubmission.expires_at.is_(None)
+    ttl_hours = current_app.config['TOKEN_TTL_HOURS']
+    if ttl_hours > 0:
+        no_expiry = and_(no_expiry, FilterBagSubmission.created_at >= now - timedelta(hours=ttl_hours))
+    return or_(FilterBagSubmission.expires_at >= now, no_expiry)
+
+
+def purge_expired_tokens(batch_size=500, pause=0.05):
+    """Delete expired, never-submitted rows in short id-ordered batches.
+
+    Each batch is its own transaction so the write lock is only held briefly.
+    Returns the number of rows deleted.
+    """
+    now = datetime.utcnow()
+    expired = token_expired_condition(now)
+
+    deleted = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(FilterBagSubmission.id, FilterBagSubmission.token, FilterBagSubmission.po_number).filter(
+            FilterBagSubmission.submitted == False,
+            FilterBagSubmission.id > last_id,
+            expired
+        ).order_by(FilterBagSubmission.id).limit(batch_size).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+
+        purged = FilterBagSubmission.query.filter(
+            FilterBagSubmission.id.in_(ids),
+            FilterBagSubmission.submitted == False
+        ).delete(synchronize_session=False)
+        bump_counters({('requests', 'pending'): -purged})
+        tokens = {row.token for row in rows}
+        # Drafts of the purged links go with them (a row submitted meanwhile keeps its token alive)
+        FormDraft.query.filter(
+            FormDraft.token.in_(tokens),
+            FormDraft.token.not_in(
+                db.session.query(FilterBagSubmission.token).filter(FilterBagSubmission.token.in_(tokens))
+            )
+        ).delete(synchronize_session=False)
+        change_feed.record_many(tokens, 'removed')
+        for po_number in {row.po_number for row in rows}:
+            refresh_po_summary(po_number)
+        db.session.commit()
+
+        deleted += purged
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+
+    return deleted
+
+# ==================== SMTP ACCOUNTS ====================
+
+class SmtpUnavailable(Exception):
+    """Raised when no configured SMTP account could send a message"""
+
+
+class SmtpAccount:
+    """One sending account. Daily usage is kept in the smtp_usage table so all workers share it"""
+
+    def __init__(self, host, port, username, password, sender=None, weight=1, daily_quota=500):
+        self.host = host
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.weight = max(float(weight), 0.0)
+        self.daily_quota = int(daily_quota)
+        self.unavailable_until = 0.0
+        self.last_error = None
+
+    @property
+    def name(self):
+        return self.username or f'{self.host}:{self.port}'
+
+    def connect(self, timeout):
+        server = smtplib.SMTP(self.host, self.port, timeout=timeout)
+        try:
+            server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    def send(self, msg, timeout):
+        with self.connect(timeout) as server:
+            server.send_message(msg)
+
+
+class SmtpPool:
+    """Spreads outgoing mail over several accounts by weight and remaining quota, with failover"""
+
+    # Replies that mean "this account is out of quota", not "this message is bad"
+    QUOTA_ERROR_HINTS = ('limit', 'quota', 'exceeded')
+    # Refusals of one message (bad recipient, sender or content) - the account itself is fine
+    MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+    def __init__(self):
+        self.accounts = []
+        self.timeout = 30
+        self.cooldown = 300
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        config = app.config
+        self.timeout = config['SMTP_TIMEOUT']
+        self.cooldown = config['SMTP_FAILURE_COOLDOWN']
+
+        if config['SMTP_ACCOUNTS']:
+            self.accounts = [
+                SmtpAccount(
+                    host=entry.get('host', config['SMTP_SERVER']),
+                    port=entry.get('port', config['SMTP_PORT']),
+                    username=entry.get('username'),
+                    password=entry.get('password'),
+                    sender=entry.get('from'),
+                    weight=entry.get('weight', 1),
+                    daily_quota=entry.get('daily_quota', config['SMTP_DAILY_QUOTA'])
+                )
+                for entry in json.loads(config['SMTP_ACCOUNTS'])
+            ]
+        else:
+            self.accounts = [SmtpAccount(
+                host=config['SMTP_SERVER'],
+                port=config['SMTP_PORT'],
+                username=config['SENDER_EMAIL'],
+                password=config['SENDER_PASSWORD'],
+                daily_quota=config['SMTP_DAILY_QUOTA']
+            )]
+
+        # Admin notifications go to SENDER_EMAIL - default it to the first account
+        if not config['SENDER_EMAIL'] and self.accounts:
+            config['SENDER_EMAIL'] = self.accounts[0].sender
+        app.extensions['smtp_pool'] = self
+
+    def _usage_today(self):
+        today = datetime.utcnow().date()
+        rows = SmtpUsage.query.filter_by(day=today).all()
+        return today, {row.account: row.sent for row in rows}
+
+    def _ordered_accounts(self, usage):
+        """Available accounts in weighted-random order; weight scales with the share of quota left"""
+        now = time.monotonic()
+        keyed = []
+        for account in self.accounts:
+            if account.unavailable_until > now:
+                continue
+            remaining = account.daily_quota - usage.get(account.name, 0)
+            if remaining <= 0:
+                continue
+            score = account.weight * remaining / account.daily_quota
+            if score <= 0:
+                continue
+            # Efraimidis-Spirakis: sorting by u ** (1 / w) is weighted sampling without replacement
+            keyed.append((random.random() ** (1.0 / score), account))
+        keyed.sort(key=lambda item: item[0], reverse=True)
+        return [account for _, account in keyed]
+
+    def _claim_quota(self, account, today):
+        """Atomically count one message against the account's quota; False if it is used up.
+
+        Runs on its own connection so it never commits or rolls back the caller's session.
+        """
+        usage = SmtpUsage.__table__
+        match = (usage.c.account == account.name) & (usage.c.day == today)
+        with db.engine.begin() as connection:
+            claimed = connection.execute(
+                usage.update()
+                .where(match, usage.c.sent < account.daily_quota)
+                .values(sent=usage.c.sent + 1)
+            ).rowcount
+            if claimed:
+                return True
+            if connection.execute(usage.select().where(match)).first():
+                return False
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(usage.insert().values(account=account.name, day=today, sent=1))
+            return True
+        except IntegrityError:
+            # Another worker created today's row first - retry the conditional update
+            return self._claim_quota(account, today)
+
+    def _release_quota(self, account, today):
+        usage = SmtpUsage.__table__
+        with db.engine.begin() as connection:
+            connection.execute(
+                usage.update()
+                .where(usage.c.account == account.name, usage.c.day == today)
+                .values(sent=usage.c.sent - 1)
+            )
+
+    def _is_account_error(self, error):
+        """True when ``error`` means the account is unusable, False when only this message was refused"""
+        if isinstance(error, self.MESSAGE_ERRORS):
+            # A refusal can still be the provider saying the account is out of quota
+            return any(h in str(error).lower() for h in self.QUOTA_ERROR_HINTS)
+        return True
+
+    def _mark_failed(self, account, error):
+        text_error = str(error).lower()
+        if isinstance(error, smtplib.SMTPResponseException) and any(h in text_error for h in self.QUOTA_ERROR_HINTS):
+            # Provider says the account is out of quota: skip it until tomorrow (UTC)
+            tomorrow = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time())
+            pause = (tomorrow - datetime.utcnow()).total_seconds()
+        else:
+            pause = self.cooldown
+        with self._lock:
+            account.unavailable_until = time.monotonic() + pause
+            account.last_error = str(error)
+
+    def deliver(self, msg):
+        """Send ``msg`` from the best available account, failing over on errors.
+
+        Sets the From header to the chosen account. Returns the account used,
+        or raises SmtpUnavailable when every account failed or is out of quota.
+        A refusal of the message itself is re-raised without failing over.
+        """
+        today, usage = self._usage_today()
+        errors = []
+        for account in self._ordered_accounts(usage):
+            if not self._claim_quota(account, today):
+                continue
+            del msg['From']
+            msg['From'] = account.sender
+            try:
+                account.send(msg, self.timeout)
+                return account
+            except (smtplib.SMTPException, OSError) as e:
+                self._release_quota(account, today)
+                if not self._is_account_error(e):
+                    raise
+                self._mark_failed(account, e)
+                mail_logger.warning("SMTP account %s failed, trying next: %s", account.name, e)
+                errors.append(f'{account.name}: {e}')
+
+        raise SmtpUnavailable('; '.join(errors) or 'All SMTP accounts are out of quota or cooling down')
+
+    def deliver_many(self, messages):
+        """Send ``messages`` over one SMTP session per account instead of one per message.
+
+        Moves on to the next account when one fails or runs out of quota. A message the
+        server refuses (recipient, sender or content) is skipped. Returns the number sent.
+        """
+        today, usage = self._usage_today()
+        pending = list(messages)
+        sent = 0
+        for account in self._ordered_accounts(usage):
+            if not pending:
+                break
+            try:
+                server = account.connect(self.timeout)
+            except (smtplib.SMTPException, OSError) as e:
+                self._mark_failed(account, e)
+                mail_logger.warning("SMTP account %s failed, trying next: %s", account.name, e)
+                continue
+
+            with server:
+                while pending and self._claim_quota(account, today):
+                    msg = pending[0]
+                    del msg['From']
+                    msg['From'] = account.sender
+                    try:
+                        server.send_message(msg)
+                    except (smtplib.SMTPException, OSError) as e:
+                        self._release_quota(account, today)
+                        if not self._is_account_error(e):
+                            mail_logger.warning("Message refused, skipping %s: %s", msg['To'], e)
+                            pending.pop(0)
+                            continue
+                        self._mark_failed(account, e)
+                        mail_logger.warning("SMTP account %s failed, trying next: %s", account.name, e)
+                        break
+                    pending.pop(0)
+                    sent += 1
+
+        if pending:
+            mail_logger.error("%d message(s) could not be sent: all SMTP accounts failed or are out of quota", len(pending))
+        return sent
+
+    def stats(self):
+        today, usage = self._usage_today()
+        now = time.monotonic()
+        return [
+            {
+                'account': account.name,
+                'host': f'{account.host}:{account.port}',
+                'weight': account.weight,
+                'daily_quota': account.daily_quota,
+                'sent_today': usage.get(account.name, 0),
+                'available': account.unavailable_until <= now,
+                'last_error': account.last_error,
+            }
+            for account in self.accounts
+        ]
+
+
+smtp_pool = SmtpPool()
+
 
 # ==================== EMAIL FUNCTIONS ====================
 
+def build_form_email(recipient_email, token, po_number=None, reminder=False):
+    """Form link email for one recipient; ``reminder`` words it as a follow-up on the same link"""
+    form_url = url_for('main.filter_form', token=token, _external=True)
+
+    po_info = f"<p><strong>PO Number:</strong> {po_number}</p>" if po_number else ""
+
+    if reminder:
+        subject = "⏰ Reminder: Filter Bag Specification Request"
+        intro = ("This is a friendly reminder that we are still waiting for your filter bag specifications. "
+                 "Please use the button below to complete the form - it only takes a few minutes.")
+    else:
+        subject = "🔧 Filter Bag Specification Request"
+        intro = ("To proceed with your order, we kindly request you to share the filter bag specifications. "
+                 "Please click the button below to complete the specification form at your convenience.")
+
+    html_body = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
+            .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
+            .button {{ display: inline-block; padding: 15px 30px; background: #667eea; color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; }}
+            .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 12px; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>🔧 Filter Bag Specification Request</h1>
+                <p>We need your filter bag specifications</p>
+            </div>
+            <div class="content">
+                <p>Dear Valued Client,</p>
+                <p>{intro}</p>
+                {po_info}
+                <center>
+                    <a href="{form_url}" class="button">📋 Fill Specification Form</a>
+                </center>
+                <p><strong>Note:</strong> This link is unique to you and can only be used once. Please complete the form at your earliest convenience.</p>
+            </div>
+            <div class="footer">
+                <p><strong>Filter Bag Specification System</strong></p>
+                <p>If you have any questions, please contact us at {current_app.config['SENDER_EMAIL']}</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['To'] = recipient_email
+    
+    html_part = MIMEText(html_body, 'html')
+    msg.attach(html_part)
+
+    return msg
+
+
 def send_form_email(recipient_email, token, po_number=None):
     """Send form link to recipient via email"""
     try:
-        form_url = url_for('filter_form', token=token, _external=True)
-        
-        po_info = f"<p><strong>PO Number:</strong> {po_number}</p>" if po_number else ""
-        
-        subject = "🔧 Filter Bag Specification Request"
-        
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
-                .button {{ display: inline-block; padding: 15px 30px; background: #667eea; color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; }}
-                .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🔧 Filter Bag Specification Request</h1>
-                    <p>We need your filter bag specifications</p>
-                </div>
-                <div class="content">
-                    <p>Dear Valued Client,</p>
-                    <p>To proceed with your order, we kindly request you to share the filter bag specifications. Please click the button below to complete the specification form at your convenience.</p>
-                    {po_info}
-                    <center>
-                        <a href="{form_url}" class="button">📋 Fill Specification Form</a>
-                    </center>
-                    <p><strong>Note:</strong> This link is unique to you and can only be used once. Please complete the form at your earliest convenience.</p>
-                </div>
-                <div class="footer">
-                    <p><strong>Filter Bag Specification System</strong></p>
-                    <p>If you have any questions, please contact us at {SENDER_EMAIL}</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = recipient_email
-        
-        html_part = MIMEText(html_body, 'html')
-        msg.attach(html_part)
-        
-        # Send email
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.send_message(msg)
-        
+        smtp_pool.deliver(build_form_email(recipient_email, token, po_number))
         return True
-    except Exception as e:
-        print(f"Error sending email: {str(e)}")
+    except Exception:
+        mail_logger.exception("Error sending form email")
         return False
 
 
+def send_form_emails_bulk(recipients, reminder=False):
+    """Send (or remind about) existing form links to many recipients over pooled SMTP sessions.
+
+    ``recipients`` is a list of ``(recipient_email, token, po_number)``.
+    """
+    try:
+        messages = [build_form_email(email, token, po_number, reminder) for email, token, po_number in recipients]
+        sent = smtp_pool.deliver_many(messages)
+        mail_logger.info("Bulk %s emails: %d of %d sent", 'reminder' if reminder else 'form link', sent, len(messages))
+        return sent
+    except Exception:
+        mail_logger.exception("Error sending bulk form emails")
+        return 0
+
+
 def send_submission_notification(submissions_list):
     """Send notification to sender when form is submitted - UPDATED for multiple bags"""
     try:
@@ -183,6 +1137,17 @@ def send_submission_notification(submissions_list):
                 spec_details = f"""
                 <tr><td><strong>Tubesheet Diameter:</strong></td><td>{submission.tubesheet_dia}</td></tr>
                 """
+
+            # Closest catalog sizes, so the admin does not have to look them up
+            try:
+                matches = closest_catalog_sizes(submission)
+            except Exception:
+                mail_logger.exception("Catalog size matching failed")
+                matches = {}
+            for field, match in matches.items():
+                spec_details += f"""
+                <tr><td><strong>Closest catalog {field.replace('_', ' ')}:</strong></td><td>{match['label']}</td></tr>
+                """
             
             bags_details += f"""
             <h4 style="color: #1f3c88; margin-top: 20px;">🛍️ Bag #{idx} - {submission.bag_type.title() if submission.bag_type else 'N/A'}</h4>
@@ -252,20 +1217,16 @@ def send_submission_notification(submissions_list):
         
         msg = MIMEMultipart('alternative')
         msg['Subject'] = subject
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = SENDER_EMAIL
+        msg['To'] = current_app.config['SENDER_EMAIL']
         
         html_part = MIMEText(html_body, 'html')
         msg.attach(html_part)
         
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.send_message(msg)
+        smtp_pool.deliver(msg)
         
         return True
-    except Exception as e:
-        print(f"Error sending notification: {str(e)}")
+    except Exception:
+        mail_logger.exception("Error sending submission notification")
         return False
 
 def send_client_submission_notification(submissions_list):
@@ -274,7 +1235,7 @@ def send_client_submission_notification(submissions_list):
         first_submission = submissions_list[0]
         bag_count = len(submissions_list)
 
-        form_url = url_for('filter_form', token=first_submission.token, _external=True)
+        form_url = url_for('main.filter_form', token=first_submission.token, _external=True)
 
         subject = f"✅ Your Filter Bag Submission Details ({bag_count} Bag{'s' if bag_count > 1 else ''})"
 
@@ -376,35 +1337,1556 @@ def send_client_submission_notification(submissions_list):
 
         msg = MIMEMultipart('alternative')
         msg['Subject'] = subject
-        msg['From'] = SENDER_EMAIL
         msg['To'] = first_submission.recipient_email
 
         msg.attach(MIMEText(html_body, 'html'))
 
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.send_message(msg)
+        smtp_pool.deliver(msg)
 
         return True
 
-    except Exception as e:
-        print(f"Error sending client notification: {str(e)}")
+    except Exception:
+        mail_logger.exception("Error sending client notification")
         return False
 
 
+def send_submission_digest(submissions_list):
+    """Send one consolidated notification to sender for many submissions, grouped by PO"""
+    try:
+        grouped = {}
+        for submission in submissions_list:
+            grouped.setdefault(submission.po_number or 'No PO', []).append(submission)
+
+        total = len(submissions_list)
+        subject = f"📬 Submission Digest - {total} new submission{'s' if total > 1 else ''} ({len(grouped)} PO{'s' if len(grouped) > 1 else ''})"
+
+        po_sections = ""
+        for po_number, submissions in grouped.items():
+            rows = ""
+            for submission in submissions:
+                if submission.bag_type == 'collar':
+                    spec = f"OD: {submission.collar_od} / ID: {submission.collar_id}"
+                elif submission.bag_type == 'snap':
+                    spec = f"Tubesheet Data: {submission.tubesheet_data}"
+                elif submission.bag_type == 'ring':
+                    spec = f"Tubesheet Diameter: {submission.tubesheet_dia}"
+                else:
+                    spec = 'N/A'
+
+                rows += f"""
+                <tr>
+                    <td>{submission.client_name or 'N/A'}<br><small>{submission.recipient_email}</small></td>
+                    <td>{submission.bag_type.title() if submission.bag_type else 'N/A'}</td>
+                    <td>{spec}</td>
+                    <td>{submission.admin_size or 'N/A'} × {submission.admin_quantity or 'N/A'}</td>
+                    <td>{submission.submitted_at.strftime('%d %b %Y, %I:%M %p') if submission.submitted_at else 'N/A'}</td>
+                </tr>
+                """
+
+            po_sections += f"""
+            <h3 style="color: #1f3c88; margin-top: 25px;">📦 PO: {po_number} ({len(submissions)})</h3>
+            <table>
+                <tr><th>Client</th><th>Bag Type</th><th>Specification</th><th>Size × Qty</th><th>Submitted At</th></tr>
+                {rows}
+            </table>
+            """
+
+        html_body = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 800px; margin: 0 auto; padding: 20px; }}
+                .header {{ background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
+                .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
+                table {{ width: 100%; border-collapse: collapse; margin: 10px 0; }}
+                th {{ text-align: left; padding: 8px; background: #eef2f7; }}
+                td {{ padding: 8px; border-bottom: 1px solid #ddd; vertical-align: top; }}
+                .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 12px; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>📬 Submission Digest</h1>
+                    <p>{total} new submission{'s' if total > 1 else ''} since the last digest</p>
+                </div>
+                <div class="content">
+                    {po_sections}
+                    <p>You can view all submissions in your dashboard.</p>
+                </div>
+                <div class="footer">
+                    <p><strong>Filter Bag Specification System</strong></p>
+                    <p>Automated digest - Do not reply to this email</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['To'] = current_app.config['SENDER_EMAIL']
+
+        msg.attach(MIMEText(html_body, 'html'))
+
+        smtp_pool.deliver(msg)
+
+        return True
+    except Exception:
+        mail_logger.exception("Error sending submission digest")
+        return False
+
+
+def send_resubmission_notification(submissions_list, changes, revision):
+    """Send sender only the fields that changed in a re-submitted form"""
+    try:
+        first_submission = submissions_list[0]
+        subject = f"✏️ Submission Updated - {first_submission.client_name or 'Client'} (Revision {revision})"
+
+        rows = ""
+        for change in changes:
+            if change.get('change') == 'added':
+                what = f"Bag #{change['bag']} added"
+                old_value, new_value = '—', ', '.join(f"{k}: {v}" for k, v in change['new'].items() if v)
+            elif change.get('change') == 'removed':
+                what = f"Bag #{change['bag']} removed"
+                old_value, new_value = ', '.join(f"{k}: {v}" for k, v in change['old'].items() if v), '—'
+            else:
+                label = change['field'].replace('_', ' ').title()
+                what = f"Bag #{change['bag']} - {label}" if change.get('bag') else label
+                old_value, new_value = change['old'] or '—', change['new'] or '—'
+            rows += f"""
+                <tr><td><strong>{what}</strong></td><td style="color:#a33;">{old_value}</td><td style="color:#1a7f37;">{new_value}</td></tr>
+            """
+
+        html_body = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 700px; margin: 0 auto; padding: 20px; }}
+                .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
+                .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
+                table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
+                th {{ text-align: left; padding: 8px; background: #eef2f7; }}
+                td {{ padding: 10px; border-bottom: 1px solid #ddd; }}
+                .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 12px; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>✏️ Submission Updated</h1>
+                    <p>Revision {revision} - {len(changes)} change{'s' if len(changes) > 1 else ''}</p>
+                </div>
+                <div class="content">
+                    <table>
+                        <tr><td><strong>Client Name:</strong></td><td colspan="2">{first_submission.client_name or 'N/A'}</td></tr>
+                        <tr><td><strong>PO Number:</strong></td><td colspan="2">{first_submission.po_number or 'N/A'}</td></tr>
+                    </table>
+
+                    <h3>🔁 Changes</h3>
+                    <table>
+                        <tr><th>Field</th><th>Before</th><th>After</th></tr>
+                        {rows}
+                    </table>
+                </div>
+                <div class="footer">
+                    <p><strong>Filter Bag Specification System</strong></p>
+                    <p>Automated notification - Do not reply to this email</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['To'] = current_app.config['SENDER_EMAIL']
+
+        msg.attach(MIMEText(html_body, 'html'))
+
+        smtp_pool.deliver(msg)
+
+        return True
+    except Exception:
+        mail_logger.exception("Error sending resubmission notification")
+        return False
+
+
+def notify_admin(submissions_list):
+    """Notify sender about a submission - immediately, or via the digest queue"""
+    config = current_app.config
+    po_number = submissions_list[0].po_number
+
+    if config['ADMIN_NOTIFY_MODE'] != 'digest' or (po_number and po_number in config['URGENT_PO_NUMBERS']):
+        return send_submission_notification(submissions_list)
+
+    for submission in submissions_list:
+        db.session.add(PendingNotification(submission_id=submission.id, po_number=submission.po_number))
+    db.session.commit()
+
+    flush_admin_digest()
+    return True
+
+
+def flush_admin_digest(force=False):
+    """Send queued notifications as one digest once the interval or size threshold is reached.
+
+    Returns the number of submissions included in the digest (0 if nothing was sent).
+    """
+    pending = PendingNotification.query.order_by(PendingNotification.created_at).all()
+    if not pending:
+        return 0
+
+    config = current_app.config
+    due = (
+        force
+        or len(pending) >= config['DIGEST_MAX_PENDING']
+        or datetime.utcnow() - pending[0].created_at >= timedelta(minutes=config['DIGEST_INTERVAL_MINUTES'])
+    )
+    if not due:
+        return 0
+
+    snapshot = [(p.id, p.submission_id, p.po_number, p.created_at) for p in pending]
+    pending_ids = [row[0] for row in snapshot]
+
+    # Claim the rows first so two workers flushing at once cannot send the same digest twice
+    claimed = PendingNotification.query.filter(
+        PendingNotification.id.in_(pending_ids)
+    ).delete(synchronize_session=False)
+    if claimed != len(pending_ids):
+        db.session.rollback()
+        return 0
+    db.session.commit()
+
+    submission_ids = [row[1] for row in snapshot]
+    submissions = FilterBagSubmission.query.filter(
+        FilterBagSubmission.id.in_(submission_ids)
+    ).order_by(FilterBagSubmission.po_number, FilterBagSubmission.submitted_at).all()
+
+    if submissions and not send_submission_digest(submissions):
+        # Put them back so the next flush retries
+        for _, submission_id, po_number, created_at in snapshot:
+            db.session.add(PendingNotification(
+                submission_id=submission_id,
+                po_number=po_number,
+                created_at=created_at
+            ))
+        db.session.commit()
+        return 0
+
+    return len(submissions)
+
+
+class DigestFlusher:
+    """Checks the digest queue on a timer, so DIGEST_INTERVAL_MINUTES holds without a new submission"""
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._thread_pid = None
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['digest_flusher'] = self
+        if app.config['ADMIN_NOTIFY_MODE'] == 'digest' and app.config['DIGEST_CHECK_INTERVAL'] > 0:
+            app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        # One timer per process, started on the first request so forked workers get their own;
+        # flush_admin_digest() claims rows first, so several workers flushing at once is safe
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            threading.Thread(target=self._run, name='digest-flusher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.app.config['DIGEST_CHECK_INTERVAL'])
+            try:
+                with self.app.app_context():
+                    flush_admin_digest()
+            except Exception:
+                mail_logger.exception("Digest flush failed")
+
+
+digest_flusher = DigestFlusher()
+
+
+# ==================== MAIL EXECUTOR ====================
+
+class MailQueueFull(Exception):
+    """Raised when the mail executor has no free queue slot"""
+
+
+class MailExecutor:
+    """Bounded thread pool that sends mail after the request has returned.
+
+    Every task holds one of ``queue_size`` slots from the moment it is reserved
+    until it finishes, so at most ``queue_size`` mails are waiting or in flight.
+    """
+
+    def __init__(self, max_workers=4, queue_size=100, drain_timeout=25):
+        self.enabled = False
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.drain_timeout = drain_timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._executor = None
+        self._pid = None
+        self._accepting = True
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_latency = 0.0
+
+    def init_app(self, app):
+        self.enabled = app.config['MAIL_EXECUTOR_ENABLED']
+        self.max_workers = app.config['MAIL_EXECUTOR_WORKERS']
+        self.queue_size = app.config['MAIL_QUEUE_SIZE']
+        self.drain_timeout = app.config['MAIL_DRAIN_TIMEOUT']
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        app.extensions['mail_executor'] = self
+        if self.enabled:
+            atexit.register(self.drain)
+
+    def _pool(self):
+        # Created lazily (and again after a fork) so a preloaded master never owns worker threads;
+        # under the lock so two first sends cannot each start a pool
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='mail')
+                    self._pid = pid
+        return self._executor
+
+    def reserve(self):
+        """Take a queue slot or raise MailQueueFull"""
+        if not self._accepting or not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise MailQueueFull('Mail queue is full')
+        return MailSlot(self)
+
+    def _submit(self, fn, args):
+        enqueued_at = time.monotonic()
+        if has_request_context():
+            request_id = g.get('request_id')
+            task = fn
+
+            def with_request_id(*call_args):
+                # g belongs to the fresh app context pushed by copy_current_request_context
+                g.request_id = request_id
+                return task(*call_args)
+            fn = copy_current_request_context(with_request_id)
+
+        def run():
+            started_at = time.monotonic()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+            ok = False
+            try:
+                ok = fn(*args) is not False
+            except Exception:
+                mail_logger.exception("Error in mail task")
+            finally:
+                finished_at = time.monotonic()
+                with self._lock:
+                    self.running -= 1
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                    self.total_wait += started_at - enqueued_at
+                    self.total_run += finished_at - started_at
+                    self.max_latency = max(self.max_latency, finished_at - enqueued_at)
+                    if self.queued == 0 and self.running == 0:
+                        self._idle.notify_all()
+                self._slots.release()
+
+        with self._lock:
+            self.queued += 1
+        self._pool().submit(run)
+
+    def drain(self, timeout=None):
+        """Stop accepting mail and wait for queued sends to finish.
+
+        Returns True if the queue emptied within ``timeout`` seconds.
+        """
+        self._accepting = False
+        if timeout is None:
+            timeout = self.drain_timeout
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self.queued or self.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+            drained = not (self.queued or self.running)
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=drained)
+        if not drained:
+            mail_logger.warning("Mail executor drain timed out with %d queued and %d running", self.queued, self.running)
+        return drained
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                'enabled': self.enabled,
+                'workers': self.max_workers,
+                'capacity': self.queue_size,
+                'queue_depth': self.queued,
+                'in_flight': self.running,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.total_wait / finished * 1000, 2) if finished else 0,
+                'avg_send_ms': round(self.total_run / finished * 1000, 2) if finished else 0,
+                'max_latency_ms': round(self.max_latency * 1000, 2),
+            }
+
+
+class MailSlot:
+    """A reserved executor slot; ``send`` queues the task, ``release`` frees an unused slot"""
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._held = True
+
+    def send(self, fn, *args):
+        self._executor._submit(fn, args)
+        self._held = False
+        return True
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self._executor._slots.release()
+
+
+class InlineMailSlot:
+    """Slot used when the executor is disabled - sends synchronously in the request"""
+
+    def send(self, fn, *args):
+        return fn(*args)
+
+    def release(self):
+        pass
+
+
+mail_executor = MailExecutor()
+
+
+def reserve_mail_slot():
+    """Reserve capacity for sending mail from a route (raises MailQueueFull when full)"""
+    if not mail_executor.enabled:
+        return InlineMailSlot()
+    return mail_executor.reserve()
+
+
+def detach_for_mail(*instances):
+    """Load and detach rows so a mail thread can still read them after the request session closes"""
+    for instance in instances:
+        db.session.refresh(instance)
+        db.session.expunge(instance)
+
+
+def send_submission_emails(submissions_list):
+    """Send the admin and client notifications for one submission"""
+    admin_ok = notify_admin(submissions_list)
+    client_ok = send_client_submission_notification(submissions_list)
+    return admin_ok and client_ok
+
+
+def send_resubmission_emails(submissions_list, changes, revision):
+    """Send the admin change summary and the updated client confirmation"""
+    admin_ok = send_resubmission_notification(submissions_list, changes, revision)
+    client_ok = send_client_submission_notification(submissions_list)
+    return admin_ok and client_ok
+
+
+# ==================== PAGE CACHE ====================
+
+class RenderedPageCache:
+    """Thread-safe LRU of rendered HTML keyed by tuples whose first item identifies the owner
+
+    (the token for form pages, the row id for dashboard cards).
+    """
+
+    def __init__(self, name, size_setting, max_entries=256):
+        self.name = name
+        self.size_setting = size_setting
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config[self.size_setting]
+        app.extensions[self.name] = self
+
+    def get(self, key):
+        with self._lock:
+            page = self._entries.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key, page):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = page
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_token(self, token):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == token]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'capacity': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+form_page_cache = RenderedPageCache('form_page_cache', 'FORM_PAGE_CACHE_SIZE')
+card_cache = RenderedPageCache('card_cache', 'CARD_CACHE_SIZE', max_entries=5000)
+
+
+def form_version(submission, draft_version=0):
+    """Version string that changes whenever anything rendered into the form page changes"""
+    changed_at = submission.submitted_at or submission.created_at
+    return f"{submission.id}:{int(bool(submission.submitted))}:{changed_at.isoformat() if changed_at else ''}:{draft_version}"
+
+
+def render_submission_card(submission):
+    """Dashboard card for one row, re-rendered only when something shown on it changes"""
+    expired = is_token_expired(submission)
+    # Bag cards also show the closest catalog sizes, so they depend on the catalog version
+    catalog_version = size_index.current_version() if submission.bag_type else 0
+    # Rows are never edited in place except the parent's submitted/revision state and expiry
+    key = (submission.id, submission.submitted_at, submission.current_revision, expired, catalog_version,
+           submission.revoked_at)
+    card = card_cache.get(key)
+    if card is None:
+        template = current_app.extensions.get('submission_card_template')
+        if template is None:
+            template = current_app.jinja_env.from_string(SUBMISSION_CARD_HTML)
+            current_app.extensions['submission_card_template'] = template
+        matches = closest_catalog_sizes(submission) if submission.bag_type else {}
+        card = Markup(template.render(submission=submission, expired=expired, matches=matches))
+        card_cache.put(key, card)
+    return card
+
+
+# ==================== LIVE UPDATES ====================
+
+class ChangeFeed:
+    """Wakes this worker's SSE streams when a submission changes.
+
+    Writers add a SubmissionChange row in the same transaction as their change; once it
+    commits, local streams are woken immediately. Streams read the rows after their cursor,
+    so changes committed by other workers are picked up on the next poll.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.sequence = 0
+
+    def record(self, token, kind):
+        db.session.add(SubmissionChange(token=token, kind=kind))
+        db.session.info['submission_changes'] = True
+
+    def record_many(self, tokens, kind):
+        if not tokens:
+            return
+        now = datetime.utcnow()
+        db.session.execute(
+            SubmissionChange.__table__.insert(),
+            [{'token': token, 'kind': kind, 'created_at': now} for token in tokens]
+        )
+        db.session.info['submission_changes'] = True
+
+    def publish(self):
+        with self._condition:
+            self.sequence += 1
+            self._condition.notify_all()
+
+    def wait(self, seen_sequence, timeout):
+        """Block until something is published after ``seen_sequence`` or the timeout passes"""
+        with self._condition:
+            if self.sequence == seen_sequence:
+                self._condition.wait(timeout)
+            return self.sequence
+
+    @staticmethod
+    def latest_id():
+        return db.session.query(db.func.max(SubmissionChange.id)).scalar() or 0
+
+    @staticmethod
+    def changes_after(cursor, limit=200):
+        return db.session.query(
+            SubmissionChange.id, SubmissionChange.token, SubmissionChange.kind
+        ).filter(SubmissionChange.id > cursor).order_by(SubmissionChange.id).limit(limit).all()
+
+
+change_feed = ChangeFeed()
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_submission_changes(session):
+    if session.info.pop('submission_changes', False):
+        change_feed.publish()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_submission_changes(session):
+    session.info.pop('submission_changes', None)
+
+
+def prune_change_log():
+    """Remove change log rows older than CHANGE_LOG_RETENTION_HOURS"""
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config['CHANGE_LOG_RETENTION_HOURS'])
+    pruned = SubmissionChange.query.filter(
+        SubmissionChange.created_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return pruned
+
+
+# ==================== STATISTICS ====================
+
+# Upper bounds (seconds) and keys of the invitation -> submission latency histogram. Minute
+# buckets at the low end: most forms are filled in quickly, and the median is interpolated
+# inside one bucket. Run rebuild-stats after changing these.
+LATENCY_BUCKETS = (
+    (5 * 60, 'le_5m'), (15 * 60, 'le_15m'), (30 * 60, 'le_30m'),
+    (3600, 'le_1h'), (6 * 3600, 'le_6h'), (24 * 3600, 'le_24h'),
+    (72 * 3600, 'le_72h'), (168 * 3600, 'le_168h'), (720 * 3600, 'le_720h'),
+)
+
+
+def latency_bucket(seconds):
+    for bound, key in LATENCY_BUCKETS:
+        if seconds <= bound:
+            return key
+    return 'gt_720h'
+
+
+def bump_counters(changes):
+    """Add ``{(metric, key): delta}`` to the counters inside the caller's transaction"""
+    dialect = db.engine.dialect.name
+    for (metric, key), delta in changes.items():
+        if not delta or key is None:
+            continue
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_dialect.insert if dialect == 'sqlite' else postgresql_dialect.insert
+            statement = insert(StatCounter).values(metric=metric, key=key, value=delta)
+            statement = statement.on_conflict_do_update(
+                index_elements=['metric', 'key'],
+                set_={'value': StatCounter.value + delta}
+            )
+            db.session.execute(statement)
+        else:
+            updated = StatCounter.query.filter_by(metric=metric, key=key).update(
+                {StatCounter.value: StatCounter.value + delta}, synchronize_session=False
+            )
+            if not updated:
+                db.session.add(StatCounter(metric=metric, key=key, value=delta))
+                db.session.flush()
+
+
+def submission_counter_changes(created_at, submitted_at, bag_submissions):
+    """Counter deltas for a parent request flipping to submitted with the given bags"""
+    changes = {('requests', 'pending'): -1, ('requests', 'submitted'): 1}
+    for bag in bag_submissions:
+        changes[('bag_type', bag.bag_type)] = changes.get(('bag_type', bag.bag_type), 0) + 1
+    if created_at and submitted_at:
+        seconds = int((submitted_at - created_at).total_seconds())
+        changes[('latency_bucket', latency_bucket(seconds))] = 1
+        changes[('latency', 'total_seconds')] = seconds
+    return changes
+
+
+def rebuild_counters():
+    """Recompute every counter from the live and archive tables (full scans - for backfills only).
+
+    Archiving does not touch the counters, so archived rows are counted too.
+    """
+    StatCounter.query.delete()
+    changes = {}
+
+    for model in (FilterBagSubmission, FilterBagSubmissionArchive):
+        # Parent rows are the requests (no bag data); child rows carry one bag each
+        parents = db.session.query(
+            model.submitted,
+            model.admin_size,
+            model.created_at,
+            model.submitted_at
+        ).filter(model.bag_type.is_(None))
+        for row in parents.yield_per(1000):
+            status = 'submitted' if row.submitted else 'pending'
+            changes[('requests', status)] = changes.get(('requests', status), 0) + 1
+            if row.admin_size:
+                changes[('admin_size', row.admin_size)] = changes.get(('admin_size', row.admin_size), 0) + 1
+            if row.submitted and row.created_at and row.submitted_at:
+                seconds = int((row.submitted_at - row.created_at).total_seconds())
+                bucket = ('latency_bucket', latency_bucket(seconds))
+                changes[bucket] = changes.get(bucket, 0) + 1
+                changes[('latency', 'total_seconds')] = changes.get(('latency', 'total_seconds'), 0) + seconds
+
+        bag_types = db.session.query(
+            model.bag_type, db.func.count(model.id)
+        ).filter(model.bag_type.isnot(None)).group_by(model.bag_type)
+        for bag_type, count in bag_types:
+            changes[('bag_type', bag_type)] = changes.get(('bag_type', bag_type), 0) + count
+
+    bump_counters(changes)
+    db.session.commit()
+    stats_cache.clear()
+
+
+def median_from_buckets(buckets):
+    """Approximate median (hours) by interpolating inside the histogram bucket holding the middle value"""
+    total = sum(buckets.values())
+    if not total:
+        return None
+    middle = total / 2.0
+    seen = 0
+    lower = 0
+    for bound, key in LATENCY_BUCKETS:
+        count = buckets.get(key, 0)
+        if count and seen + count >= middle:
+            return round((lower + (bound - lower) * (middle - seen) / count) / 3600, 3)
+        seen += count
+        lower = bound
+    return LATENCY_BUCKETS[-1][0] / 3600
+
+
+def compute_stats(top_sizes=5):
+    counters = {}
+    for row in StatCounter.query.all():
+        counters.setdefault(row.metric, {})[row.key] = row.value
+
+    request_counts = counters.get('requests', {})
+    latency_buckets = counters.get('latency_bucket', {})
+    submitted_count = sum(latency_buckets.values())
+    total_seconds = counters.get('latency', {}).get('total_seconds', 0)
+
+    sizes = sorted(counters.get('admin_size', {}).items(), key=lambda item: item[1], reverse=True)
+    return {
+        'pending': request_counts.get('pending', 0),
+        'submitted': request_counts.get('submitted', 0),
+        'by_bag_type': counters.get('bag_type', {}),
+        'median_hours_to_submit': median_from_buckets(latency_buckets),
+        'mean_hours_to_submit': round(total_seconds / submitted_count / 3600, 2) if submitted_count else None,
+        'top_sizes': [{'size': size, 'count': count} for size, count in sizes[:top_sizes]],
+        'generated_at': isoformat_utc(datetime.utcnow()),
+    }
+
+
+class TTLCache:
+    """Single-value in-memory cache that recomputes after ``ttl`` seconds"""
+
+    def __init__(self):
+        self.ttl = 30
+        self._value = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, compute):
+        now = time.monotonic()
+        if self._value is not None and now < self._expires:
+            return self._value
+        with self._lock:
+            if self._value is None or time.monotonic() >= self._expires:
+                self._value = compute()
+                self._expires = time.monotonic() + self.ttl
+            return self._value
+
+    def clear(self):
+        self._value = None
+
+
+stats_cache = TTLCache()
+
+
+# ==================== PURCHASE ORDERS ====================
+
+def po_rollup(po_number):
+    """Column values of a PO's roll-up over live and archived rows, or None when it has no rows"""
+    request_count = submitted_count = admin_quantity_total = 0
+    first_sent_at = last_submitted_at = None
+    bag_types = {}
+    # Archived rows still belong to the PO - both tables have the po_number index
+    for model in (FilterBagSubmission, FilterBagSubmissionArchive):
+        requests_row = db.session.query(
+            db.func.count(model.id),
+            db.func.sum(db.case((model.submitted == True, 1), else_=0)),
+            db.func.sum(model.admin_quantity),
+            db.func.min(model.created_at),
+            db.func.max(model.submitted_at)
+        ).filter(
+            model.po_number == po_number,
+            model.bag_type.is_(None)
+        ).one()
+        request_count += requests_row[0] or 0
+        submitted_count += requests_row[1] or 0
+        admin_quantity_total += requests_row[2] or 0
+        if requests_row[3] and (first_sent_at is None or requests_row[3] < first_sent_at):
+            first_sent_at = requests_row[3]
+        if requests_row[4] and (last_submitted_at is None or requests_row[4] > last_submitted_at):
+            last_submitted_at = requests_row[4]
+
+        for bag_type, count in db.session.query(
+            model.bag_type, db.func.count(model.id)
+        ).filter(
+            model.po_number == po_number,
+            model.bag_type.isnot(None)
+        ).group_by(model.bag_type):
+            bag_types[bag_type] = bag_types.get(bag_type, 0) + count
+
+    if not request_count and not bag_types:
+        return None
+    return {
+        'po_number': po_number,
+        'request_count': request_count,
+        'submitted_count': submitted_count,
+        'bag_count': sum(bag_types.values()),
+        'admin_quantity_total': admin_quantity_total,
+        'bag_types': json.dumps(bag_types, separators=(',', ':'), sort_keys=True),
+        'first_sent_at': first_sent_at,
+        'last_submitted_at': last_submitted_at,
+        'updated_at': datetime.utcnow(),
+    }
+
+
+def refresh_po_summary(po_number):
+    """Recompute one PO's stored roll-up inside the caller's transaction (every query uses the po_number index)"""
+    if not po_number:
+        return
+
+    values = po_rollup(po_number)
+    if values is None:
+        PoSummary.query.filter_by(po_number=po_number).delete(synchronize_session=False)
+        return
+
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_dialect.insert if dialect == 'sqlite' else postgresql_dialect.insert
+        statement = insert(PoSummary).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=['po_number'],
+            set_={k: v for k, v in values.items() if k != 'po_number'}
+        )
+        db.session.execute(statement)
+    else:
+        db.session.merge(PoSummary(**values))
+
+
+def get_po_summary(po_number):
+    """Roll-up for a PO as a dict; None for an unknown PO.
+
+    Reads the stored row; a PO without one (e.g. written before roll-ups existed) is
+    computed on the fly and not persisted, so a read never writes.
+    """
+    summary = db.session.get(PoSummary, po_number)
+    if summary is not None:
+        values = {column.name: getattr(summary, column.name) for column in PoSummary.__table__.columns}
+    else:
+        values = po_rollup(po_number)
+        if values is None:
+            return None
+
+    pending = values['request_count'] - values['submitted_count']
+    if values['request_count'] and pending == 0:
+        status = 'submitted'
+    elif values['submitted_count']:
+        status = 'partial'
+    else:
+        status = 'pending'
+
+    return {
+        'po_number': values['po_number'],
+        'status': status,
+        'requests': values['request_count'],
+        'submitted': values['submitted_count'],
+        'pending': pending,
+        'bags': values['bag_count'],
+        'bag_types': json.loads(values['bag_types']),
+        'admin_quantity_total': values['admin_quantity_total'],
+        'first_sent_at': values['first_sent_at'],
+        'last_submitted_at': values['last_submitted_at'],
+    }
+
+
+def po_requests(po_number):
+    """Every request for a PO (live and archived) with its current bag specs, oldest first"""
+    rows = sorted(
+        FilterBagSubmission.query.filter_by(po_number=po_number).all()
+        + FilterBagSubmissionArchive.query.filter_by(po_number=po_number).all(),
+        key=lambda row: row.id
+    )
+
+    requests_by_token = {}
+    for row in rows:
+        entry = requests_by_token.get(row.token)
+        if entry is None:
+            # The first row of a token is the request itself, the rest are its bags
+            requests_by_token[row.token] = {
+                'token': row.token,
+                'recipient_email': row.recipient_email,
+                'submitted': bool(row.submitted),
+                'expired': is_token_expired(row),
+                'created_at': row.created_at,
+                'submitted_at': row.submitted_at,
+                'revision': row.current_revision or 0,
+                'admin_quantity': row.admin_quantity,
+                'admin_size': row.admin_size,
+                'client_name': None,
+                'bags': [],
+            }
+        else:
+            entry['client_name'] = entry['client_name'] or row.client_name
+            entry['bags'].append(bag_spec(row))
+    return list(requests_by_token.values())
+
+
+# ==================== SIZE CATALOG INDEX ====================
+
+class SizeIndex:
+    """Per bag type, the catalog sorted by case-folded name (prefix lookups) and by parsed
+    millimetres (nearest size), both searched with bisect.
+
+    Built from bag_sizes on first use, updated in place by this worker's add/delete and
+    rebuilt after ``ttl`` seconds so edits made through other workers show up. ``version``
+    changes whenever the contents do, for caches of anything derived from the catalog.
+    """
+
+    def __init__(self):
+        self.ttl = 300
+        self.version = 0
+        self._entries = {}  # bag_type -> sorted [(folded name, name, id)]
+        self._dimensions = {}  # bag_type -> sorted [(mm, name, id)] for names that parse
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def _ensure_built(self):
+        if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+            return
+        entries = {}
+        dimensions = {}
+        for size_id, size_name, bag_type in db.session.query(BagSize.id, BagSize.size_name, BagSize.bag_type):
+            entries.setdefault(bag_type, []).append((size_name.casefold(), size_name, size_id))
+            size_mm = parse_dimension_mm(size_name)
+            if size_mm is not None:
+                dimensions.setdefault(bag_type, []).append((size_mm, size_name, size_id))
+        for items in list(entries.values()) + list(dimensions.values()):
+            items.sort()
+        if entries != self._entries:
+            self.version += 1
+        self._entries = entries
+        self._dimensions = dimensions
+        self._built_at = time.monotonic()
+
+    def current_version(self):
+        with self._lock:
+            self._ensure_built()
+            return self.version
+
+    def nearest(self, bag_type, value_mm):
+        """``(size_name, size_mm)`` of the catalog size closest to ``value_mm``, or None"""
+        with self._lock:
+            self._ensure_built()
+            items = self._dimensions.get(bag_type, [])
+            position = bisect.bisect_left(items, (value_mm,))
+            neighbours = items[max(position - 1, 0):position + 1]
+            if not neighbours:
+                return None
+            size_mm, size_name, _ = min(neighbours, key=lambda item: abs(item[0] - value_mm))
+            return size_name, size_mm
+
+    def suggest(self, bag_type, query, limit=10):
+        """Prefix matches in name order, then substring matches"""
+        needle = query.strip().casefold()
+        with self._lock:
+            self._ensure_built()
+            items = self._entries.get(bag_type, [])
+
+            position = bisect.bisect_left(items, (needle,))
+            matches = []
+            while position < len(items) and len(matches) < limit and items[position][0].startswith(needle):
+                matches.append(items[position])
+                position += 1
+
+            if needle and len(matches) < limit:
+                for item in items:
+                    if needle in item[0] and not item[0].startswith(needle):
+                        matches.append(item)
+                        if len(matches) >= limit:
+                            break
+
+        return [{'id': size_id, 'size_name': size_name} for _, size_name, size_id in matches]
+
+    def add(self, bag_type, size_id, size_name):
+        with self._lock:
+            if self._built_at is None:
+                return
+            bisect.insort(self._entries.setdefault(bag_type, []), (size_name.casefold(), size_name, size_id))
+            size_mm = parse_dimension_mm(size_name)
+            if size_mm is not None:
+                bisect.insort(self._dimensions.setdefault(bag_type, []), (size_mm, size_name, size_id))
+            self.version += 1
+
+    def remove(self, bag_type, size_id, size_name):
+        with self._lock:
+            for items, key in ((self._entries.get(bag_type, []), size_name.casefold()),
+                               (self._dimensions.get(bag_type, []), parse_dimension_mm(size_name))):
+                if key is None:
+                    continue
+                position = bisect.bisect_left(items, (key, size_name, size_id))
+                if position < len(items) and items[position][2] == size_id:
+                    del items[position]
+            self.version += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+            self.version += 1
+
+
+size_index = SizeIndex()
+
+
+# ==================== HEALTH CHECKS ====================
+
+class HealthMonitor:
+    """Checks DB and SMTP on a background thread and caches the result for /readyz"""
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._thread_pid = None
+        self._result = None
+        self._smtp_result = None
+        self._smtp_checked = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['health_monitor'] = self
+
+    def ensure_started(self):
+        # One refresher per process; started lazily so it also runs in forked workers
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._result = None
+            self._smtp_result = None
+            self._thread_pid = os.getpid()
+            threading.Thread(target=self._run, name='health-monitor', daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self._result = self.check()
+            except Exception:
+                # Keep the thread alive; the last result goes stale and /readyz reports it
+                logger.exception("Health check failed")
+            time.sleep(self.app.config['HEALTH_CHECK_INTERVAL'])
+
+    def check(self):
+        with self.app.app_context():
+            checks = {'database': self._check_database()}
+            if self.app.config['HEALTH_CHECK_SMTP']:
+                now = time.monotonic()
+                if self._smtp_result is None or now - self._smtp_checked >= self.app.config['HEALTH_CHECK_SMTP_INTERVAL']:
+                    self._smtp_result = self._check_smtp()
+                    self._smtp_checked = now
+                checks['smtp'] = self._smtp_result
+        return {
+            'ready': all(c['ok'] for c in checks.values()),
+            'checks': checks,
+            'checked_at': datetime.utcnow(),
+        }
+
+    def _check_database(self):
+        started = time.monotonic()
+        try:
+            db.session.execute(text('SELECT 1'))
+            return {'ok': True, 'latency_ms': round((time.monotonic() - started) * 1000, 2)}
+        except Exception as e:
+            logger.warning("Database health check failed: %s", e)
+            return {'ok': False, 'error': str(e)}
+        finally:
+            db.session.remove()
+
+    def _check_smtp(self):
+        """Ready if at least one sending account's server answers"""
+        timeout = self.app.config['HEALTH_CHECK_TIMEOUT']
+        servers = {}
+        for account in smtp_pool.accounts:
+            key = f'{account.host}:{account.port}'
+            if key in servers:
+                continue
+            started = time.monotonic()
+            try:
+                with smtplib.SMTP(account.host, account.port, timeout=timeout) as server:
+                    server.ehlo()
+                    server.noop()
+                servers[key] = {'ok': True, 'latency_ms': round((time.monotonic() - started) * 1000, 2)}
+            except Exception as e:
+                logger.warning("SMTP health check failed for %s: %s", key, e)
+                servers[key] = {'ok': False, 'error': str(e)}
+        return {'ok': any(r['ok'] for r in servers.values()), 'servers': servers}
+
+    def status(self):
+        self.ensure_started()
+        result = self._result
+        if result is None:
+            return {'ready': False, 'checks': {}, 'reason': 'starting'}
+
+        max_age = timedelta(seconds=self.app.config['HEALTH_CHECK_INTERVAL'] * 3)
+        if datetime.utcnow() - result['checked_at'] > max_age:
+            return dict(result, ready=False, reason='stale')
+        return result
+
+
+health_monitor = HealthMonitor()
+
+
+# ==================== DIMENSIONS ====================
+
+# Free-text size column -> numeric millimetre shadow column
+DIMENSION_COLUMNS = {
+    'collar_od': 'collar_od_mm',
+    'collar_id': 'collar_id_mm',
+    'tubesheet_dia': 'tubesheet_dia_mm',
+    'admin_size': 'admin_size_mm',
+}
+
+MM_PER_UNIT = {'mm': 1.0, 'cm': 10.0, 'm': 1000.0, 'in': 25.4, 'inch': 25.4, 'inches': 25.4, '"': 25.4}
+
+# "150", "150mm", "15.5 cm", "6,5cm", "1,000 mm", "6 1/2 in", "1/2in", '6"' - the first
+# dimension wins ("150 x 2000", "150mmx2000"). A comma followed by exactly three digits is a
+# thousands separator, any other comma is a decimal point.
+# "a/b" without an inch unit is only a fraction when it reads like one ("1/2", "3/16")
+INCH_FRACTION_DENOMINATORS = {2, 4, 8, 16, 32, 64}
+
+DIMENSION_PATTERN = re.compile(r"""
+    (?<!\d)(?<!\d[.,/])                             # never start inside another number
+    (?:
+        (?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?     # 1,000 / 1,000.5
+                  |\d+(?:[.,]\d+)?)                 # 150 / 15.5 / 6,5
+        (?:\s+(?P<numerator>\d+)/(?P<denominator>\d+))?   # mixed fraction: 6 1/2
+      | (?P<bare_numerator>\d+)/(?P<bare_denominator>\d+) # bare fraction: 1/2
+    )
+    (?![.,/]?\d)                                    # and never stop inside one
+    \s*(?P<unit>mm|cm|inches|inch|in|m|")?
+    (?=[x×]\s*\d|[^a-z]|$)                     # "x"/"×" between dimensions is a separator
+""", re.IGNORECASE | re.VERBOSE)
+
+
+def parse_dimension_mm(value):
+    """Millimetres for a free-text size, or None when no number can be found (unitless = mm)"""
+    if value is None:
+        return None
+    match = DIMENSION_PATTERN.search(str(value))
+    if not match:
+        return None
+    unit = (match['unit'] or 'mm').lower()
+    if match['bare_numerator']:
+        numerator, denominator = int(match['bare_numerator']), int(match['bare_denominator'])
+        if MM_PER_UNIT[unit] == MM_PER_UNIT['in'] or (
+                numerator < denominator and denominator in INCH_FRACTION_DENOMINATORS):
+            if not denominator:
+                return None
+            amount = numerator / denominator
+        else:
+            # "160/6000" (diameter/length), "150/160" (OD/ID): the first dimension wins
+            amount = numerator
+    else:
+        number = match['number']
+        if re.fullmatch(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?', number):
+            amount = float(number.replace(',', ''))
+        else:
+            amount = float(number.replace(',', '.'))
+        if match['numerator'] and int(match['denominator']):
+            amount += int(match['numerator']) / int(match['denominator'])
+    return round(amount * MM_PER_UNIT[unit], 3)
+
+
+@event.listens_for(FilterBagSubmission, 'before_insert')
+@event.listens_for(FilterBagSubmission, 'before_update')
+def _set_dimension_columns(mapper, connection, target):
+    for column, mm_column in DIMENSION_COLUMNS.items():
+        setattr(target, mm_column, parse_dimension_mm(getattr(target, column)))
+
+
+def backfill_dimensions(batch_size=500, pause=0.05, reparse=False):
+    """Fill the *_mm columns of rows written before they existed, one id-ordered batch per transaction.
+
+    ``reparse`` recomputes every row, e.g. after a parser fix. Returns the number of rows updated.
+    """
+    table = FilterBagSubmission.__table__
+    missing = true() if reparse else or_(*[
+        and_(table.c[mm_column].is_(None), table.c[column].isnot(None))
+        for column, mm_column in DIMENSION_COLUMNS.items()
+    ])
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(table.c.id, *[table.c[column] for column in DIMENSION_COLUMNS])
+            .where(table.c.id > last_id, missing)
+            .order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        params = [
+            dict({'row_id': row.id}, **{
+                mm_column: parse_dimension_mm(getattr(row, column))
+                for column, mm_column in DIMENSION_COLUMNS.items()
+            })
+            for row in rows
+        ]
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('row_id')).values(
+                {mm_column: db.bindparam(mm_column) for mm_column in DIMENSION_COLUMNS.values()}
+            ),
+            params
+        )
+        db.session.commit()
+
+        updated += len(rows)
+        last_id = rows[-1].id
+        if pause:
+            time.sleep(pause)
+
+    return updated
+
+
+def parse_dimension_ranges(args):
+    """``[(mm_column, low, high)]`` from ?collar_od_min=150&collar_od_max=16cm style arguments"""
+    ranges = []
+    for column, mm_column in DIMENSION_COLUMNS.items():
+        bounds = []
+        for suffix in ('_min', '_max'):
+            raw = args.get(column + suffix)
+            if raw is None or raw.strip() == '':
+                bounds.append(None)
+                continue
+            value = parse_dimension_mm(raw)
+            if value is None:
+                raise ValueError(f'{column}{suffix} must be a size such as 150 or 15cm')
+            bounds.append(value)
+        if bounds != [None, None]:
+            ranges.append((mm_column, *bounds))
+    return ranges
+
+
+def dimension_conditions(model, ranges):
+    """SQLAlchemy filter expressions for parse_dimension_ranges() output"""
+    conditions = []
+    for mm_column, low, high in ranges:
+        column = getattr(model, mm_column)
+        if low is not None:
+            conditions.append(column >= low)
+        if high is not None:
+            conditions.append(column <= high)
+    return conditions
+
+
+def closest_catalog_sizes(submission):
+    """``{field: {"size_name", "delta_mm", "label"}}`` - nearest catalog size for each dimension of a bag row.
+
+    ``delta_mm`` is catalog minus submitted. Collar OD and ID are matched separately against the
+    collar catalog, which (like the form's shared datalist) holds single diameters.
+    """
+    matches = {}
+    for field in BAG_TYPE_FIELDS.get(submission.bag_type, ()):
+        mm_column = DIMENSION_COLUMNS.get(field)
+        value_mm = getattr(submission, mm_column) if mm_column else None
+        if value_mm is None:
+            value_mm = parse_dimension_mm(getattr(submission, field))
+        if value_mm is None:
+            continue
+        nearest = size_index.nearest(submission.bag_type, value_mm)
+        if nearest is None:
+            continue
+        size_name, size_mm = nearest
+        delta_mm = round(size_mm - value_mm, 3)
+        matches[field] = {
+            'size_name': size_name,
+            'delta_mm': delta_mm,
+            'label': f"{size_name} ({'exact' if delta_mm == 0 else f'{delta_mm:+g} mm'})",
+        }
+    return matches
+
+
+# ==================== VALIDATION ====================
+
+# Required specification fields per bag type
+BAG_TYPE_FIELDS = {
+    'collar': ('collar_od', 'collar_id'),
+    'snap': ('tubesheet_data',),
+    'ring': ('tubesheet_dia',),
+}
+
+# Longest value accepted per field (matches the column sizes)
+BAG_FIELD_MAX_LENGTHS = {
+    'collar_od': 100,
+    'collar_id': 100,
+    'tubesheet_data': 2000,
+    'tubesheet_dia': 100,
+    'client_name': 200,
+    'client_email': 200,
+}
+
+
+def validate_bag(bag, number):
+    """Return (cleaned bag dict, None) or (None, error message) for one bag of a submission"""
+    if not isinstance(bag, dict):
+        return None, f'Bag #{number} is not valid'
+
+    bag_type = str(bag.get('bag_type') or '').strip().lower()
+    if bag_type not in BAG_TYPE_FIELDS:
+        return None, f'Please select a bag type for Bag #{number}'
+
+    cleaned = {'bag_type': bag_type}
+    for field, max_length in BAG_FIELD_MAX_LENGTHS.items():
+        value = bag.get(field)
+        if value is None:
+            cleaned[field] = None
+            continue
+        value = str(value).strip()
+        if len(value) > max_length:
+            return None, f'{field.replace("_", " ").title()} is too long for Bag #{number}'
+        cleaned[field] = value or None
+
+    for field in BAG_TYPE_FIELDS[bag_type]:
+        if not cleaned[field]:
+            return None, f'Please fill {field.replace("_", " ").title()} for Bag #{number}'
+
+    return cleaned, None
+
+
+def validate_size(size_name, bag_type):
+    """Return ((size_name, bag_type), None) or (None, error message) for one catalog size"""
+    size_name = str(size_name or '').strip()
+    bag_type = str(bag_type or '').strip().lower()
+    if not size_name:
+        return None, 'size_name is required'
+    if len(size_name) > 100:
+        return None, 'size_name is too long'
+    if bag_type not in BAG_TYPE_FIELDS:
+        return None, f'bag_type must be one of {", ".join(BAG_TYPE_FIELDS)}'
+    return (size_name, bag_type), None
+
+
+# Fields kept per bag in a revision, in display order
+BAG_SPEC_FIELDS = (
+    'bag_type', 'collar_od', 'collar_id', 'tubesheet_data', 'tubesheet_dia', 'client_name', 'client_email'
+)
+
+
+def bag_spec(bag):
+    """Revision snapshot of one bag, from a cleaned dict or a FilterBagSubmission row"""
+    if isinstance(bag, dict):
+        return {field: bag.get(field) for field in BAG_SPEC_FIELDS}
+    return {field: getattr(bag, field) for field in BAG_SPEC_FIELDS}
+
+
+def current_bag_specs(parent_submission):
+    """(bag specs, remarks) currently on record for a submitted request"""
+    if parent_submission.current_revision:
+        revision = SubmissionRevision.query.filter_by(
+            token=parent_submission.token,
+            revision=parent_submission.current_revision
+        ).first()
+        if revision:
+            return json.loads(revision.bags), revision.remarks
+
+    # Submitted before revisions were recorded - read the bag rows
+    bag_rows = FilterBagSubmission.query.filter(
+        FilterBagSubmission.token == parent_submission.token,
+        FilterBagSubmission.id != parent_submission.id
+    ).order_by(FilterBagSubmission.id).all()
+    return [bag_spec(row) for row in bag_rows], (bag_rows[0].remarks if bag_rows else None)
+
+
+def diff_bag_specs(old_bags, old_remarks, new_bags, new_remarks):
+    """Compact list of what changed between two revisions"""
+    changes = []
+    for index in range(max(len(old_bags), len(new_bags))):
+        number = index + 1
+        if index >= len(old_bags):
+            changes.append({'bag': number, 'change': 'added', 'new': new_bags[index]})
+        elif index >= len(new_bags):
+            changes.append({'bag': number, 'change': 'removed', 'old': old_bags[index]})
+        else:
+            for field in BAG_SPEC_FIELDS:
+                old_value = old_bags[index].get(field)
+                new_value = new_bags[index].get(field)
+                if old_value != new_value:
+                    changes.append({'bag': number, 'field': field, 'old': old_value, 'new': new_value})
+    if (old_remarks or None) != (new_remarks or None):
+        changes.append({'field': 'remarks', 'old': old_remarks, 'new': new_remarks})
+    return changes
+
+
+# Draft fields a bag may carry (client name/email live at the top level of the draft)
+DRAFT_BAG_FIELDS = ('bag_type', 'collar_od', 'collar_id', 'tubesheet_data', 'tubesheet_dia')
+DRAFT_TOP_FIELDS = {'client_name': 200, 'global_remarks': 5000}
+
+
+def apply_draft_patch(draft, changes, max_bags):
+    """Apply ``{"path": value}`` changes (None deletes) to a draft dict in place.
+
+    Paths are "client_name", "global_remarks", "bags.<n>" or "bags.<n>.<field>".
+    Returns an error message, or None when every path was valid.
+    """
+    bags = draft.setdefault('bags', {})
+    for path, value in changes.items():
+        if value is not None and not isinstance(value, (str, int, float)):
+            return f'Invalid value for {path}'
+        value = None if value is None else str(value)
+
+        if path in DRAFT_TOP_FIELDS:
+            if value is not None and len(value) > DRAFT_TOP_FIELDS[path]:
+                return f'{path} is too long'
+            if value is None:
+                draft.pop(path, None)
+            else:
+                draft[path] = value
+            continue
+
+        parts = path.split('.')
+        if parts[0] != 'bags' or len(parts) not in (2, 3) or not parts[1].isdigit():
+            return f'Unknown field {path}'
+        number = parts[1]
+        if not 1 <= int(number) <= max_bags:
+            return f'Bag number out of range in {path}'
+
+        if len(parts) == 2:
+            if value is not None:
+                return f'Only whole-bag removal is allowed for {path}'
+            bags.pop(number, None)
+            continue
+
+        field = parts[2]
+        if field not in DRAFT_BAG_FIELDS:
+            return f'Unknown field {path}'
+        if value is not None and len(value) > BAG_FIELD_MAX_LENGTHS.get(field, 50):
+            return f'{path} is too long'
+        bag = bags.setdefault(number, {})
+        if value is None:
+            bag.pop(field, None)
+        else:
+            bag[field] = value
+    return None
+
+
+def draft_to_payload(draft):
+    """Turn a stored draft into the same shape the form posts on submit"""
+    bags = []
+    for number in sorted(draft.get('bags', {}), key=int):
+        stored = draft['bags'][number]
+        bag_type = stored.get('bag_type')
+        # Only the fields of the chosen type - a type switch leaves the old ones behind
+        bag = {f: stored[f] for f in BAG_TYPE_FIELDS.get(bag_type, ()) if f in stored}
+        bag['bag_type'] = bag_type
+        bag['client_name'] = draft.get('client_name')
+        bags.append(bag)
+    return {'bags': bags, 'global_remarks': draft.get('global_remarks')}
+
+
+def specs_to_draft(bag_specs, remarks):
+    """Draft dict that pre-fills the form with an existing submission (for Edit & Re-Submit)"""
+    draft = {'bags': {}}
+    for number, spec in enumerate(bag_specs, 1):
+        draft['bags'][str(number)] = {f: spec.get(f) for f in DRAFT_BAG_FIELDS if spec.get(f)}
+        if spec.get('client_name'):
+            draft['client_name'] = spec['client_name']
+    if remarks:
+        draft['global_remarks'] = remarks
+    return draft
+
+
+def payload_too_large(error):
+    return jsonify({
+        'success': False,
+        'message': 'Submission is too large'
+    }), 413
+
+
 # ==================== ROUTES ====================
 
-@app.route('/')
-@app.route('/sender')
+@bp.route('/')
+@bp.route('/sender')
 def sender_page():
     """Admin page to send form links to recipients"""
     return render_template_string(SENDER_HTML)
 
 
-@app.route('/api/send-form', methods=['POST'])
+@bp.route('/healthz')
+def healthz():
+    """Liveness probe - the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+
+@bp.route('/readyz')
+def readyz():
+    """Readiness probe - cached DB/SMTP status from the background health monitor"""
+    status = health_monitor.status()
+    body = {
+        'status': 'ready' if status['ready'] else 'not ready',
+        'checks': status['checks'],
+        'checked_at': status.get('checked_at'),
+    }
+    if status.get('reason'):
+        body['reason'] = status['reason']
+    return jsonify(body), 200 if status['ready'] else 503
+
+
+@bp.route('/api/send-form', methods=['POST'])
 def send_form():
     """API endpoint to send form link to recipient"""
+    mail_slot = None
     try:
         data = request.get_json()
 
@@ -444,6 +2926,10 @@ def send_form():
                 'message': 'Quantity must be a valid positive number'
             }), 400
 
+        # ================= RESERVE MAIL CAPACITY =================
+
+        mail_slot = reserve_mail_slot()
+
         # ================= CREATE TOKEN =================
 
         token = secrets.token_urlsafe(32)
@@ -455,22 +2941,26 @@ def send_form():
             recipient_email=recipient_email,
             po_number=po_number if po_number else None,
             admin_quantity=admin_quantity,
-            admin_size=admin_size
+            admin_size=admin_size,
+            expires_at=new_token_expiry()
         )
 
         db.session.add(submission)
+        bump_counters({('requests', 'pending'): 1, ('admin_size', admin_size): 1})
+        change_feed.record(token, 'created')
+        refresh_po_summary(submission.po_number)
         db.session.commit()
 
         # ================= SEND EMAIL =================
 
-        email_sent = send_form_email(recipient_email, token, po_number)
+        email_sent = mail_slot.send(send_form_email, recipient_email, token, po_number)
 
         if email_sent:
             return jsonify({
                 'success': True,
-                'message': f'Form link sent successfully to {recipient_email}!' + 
+                'message': f'Form link {"queued for" if mail_executor.enabled else "sent successfully to"} {recipient_email}!' + 
                            (f' (PO: {po_number})' if po_number else ''),
-                'form_url': url_for('filter_form', token=token, _external=True)
+                'form_url': url_for('main.filter_form', token=token, _external=True)
             })
         else:
             return jsonify({
@@ -478,15 +2968,24 @@ def send_form():
                 'message': 'Failed to send email. Please check SMTP settings.'
             }), 500
 
+    except MailQueueFull:
+        return jsonify({
+            'success': False,
+            'message': 'Mail queue is full. Please try again in a moment.'
+        }), 503
     except Exception as e:
+        logger.exception("send_form failed")
         db.session.rollback()
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
         }), 500
+    finally:
+        if mail_slot:
+            mail_slot.release()
 
 
-@app.route('/api/generate-link', methods=['POST'])
+@bp.route('/api/generate-link', methods=['POST'])
 def generate_link():
     """API endpoint to generate form link without sending email"""
     try:
@@ -498,12 +2997,16 @@ def generate_link():
         submission = FilterBagSubmission(
             token=token,
             recipient_email='direct-link-generated',
-            po_number=po_number if po_number else None
+            po_number=po_number if po_number else None,
+            expires_at=new_token_expiry()
         )
         db.session.add(submission)
+        bump_counters({('requests', 'pending'): 1})
+        change_feed.record(token, 'created')
+        refresh_po_summary(submission.po_number)
         db.session.commit()
         
-        form_url = url_for('filter_form', token=token, _external=True)
+        form_url = url_for('main.filter_form', token=token, _external=True)
         
         return jsonify({
             'success': True,
@@ -512,16 +3015,30 @@ def generate_link():
         })
     
     except Exception as e:
+        logger.exception("generate_link failed")
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
         }), 500
 
 
-@app.route('/form/<token>')
+@bp.route('/form/<token>')
 def filter_form(token):
     """Display filter bag specification form to recipient"""
-    submission = FilterBagSubmission.query.filter_by(token=token).first()
+    submission = db.session.query(
+        FilterBagSubmission.id,
+        FilterBagSubmission.token,
+        FilterBagSubmission.current_revision,
+        FilterBagSubmission.submitted,
+        FilterBagSubmission.created_at,
+        FilterBagSubmission.submitted_at,
+        FilterBagSubmission.recipient_email,
+        FilterBagSubmission.po_number,
+        FilterBagSubmission.admin_quantity,
+        FilterBagSubmission.admin_size,
+        FilterBagSubmission.expires_at,
+        FilterBagSubmission.revoked_at
+    ).filter_by(token=token).order_by(FilterBagSubmission.id).first()
     
     if not submission:
         return """
@@ -530,116 +3047,1010 @@ def filter_form(token):
             <p>This form link is not valid.</p>
         </div>
         """, 404
+
+    if submission.revoked_at and not submission.submitted:
+        return """
+        <div style='text-align:center; padding:50px; font-family:Arial;'>
+            <h2>🚫 This form link has been cancelled</h2>
+            <p>Please contact us if you still need to send specifications.</p>
+        </div>
+        """, 410
+
+    if is_token_expired(submission):
+        return """
+        <div style='text-align:center; padding:50px; font-family:Arial;'>
+            <h2>⌛ This form link has expired</h2>
+            <p>Please contact us for a new link.</p>
+        </div>
+        """, 410
+
+    if edit_window_closed(submission):
+        return """
+        <div style='text-align:center; padding:50px; font-family:Arial;'>
+            <h2>🔒 This submission can no longer be edited</h2>
+            <p>Please contact us if your specifications have changed.</p>
+        </div>
+        """, 410
     
-    
+    draft = db.session.get(FormDraft, token)
+    version = form_version(submission, draft.version if draft else 0)
+    cache_key = (token, version)
+
+    page = form_page_cache.get(cache_key)
+    if page is None:
+        if draft:
+            draft_data = json.loads(draft.data)
+        elif submission.submitted:
+            # Edit & Re-Submit: start from what is on record
+            draft_data = specs_to_draft(*current_bag_specs(submission))
+        else:
+            draft_data = None
+
+        page = render_template_string(
+            FILTER_FORM_HTML, 
+            token=token, 
+            recipient_email=submission.recipient_email,
+            po_number=submission.po_number,
+            admin_quantity=submission.admin_quantity,
+            admin_size=submission.admin_size,
+            draft=draft_data,
+            draft_version=draft.version if draft else 0
+
+        )
+        form_page_cache.put(cache_key, page)
+
+    response = make_response(page)
+    response.set_etag(hashlib.sha1(f"{token}:{version}".encode()).hexdigest())
+    changed_at = submission.submitted_at or submission.created_at
+    response.last_modified = max(changed_at, draft.updated_at) if draft and draft.updated_at else changed_at
+    # Browsers may keep the page but must revalidate, so a submit is seen on the next visit
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def open_form_parent(token):
+    """Parent row for a token that can still be filled in, or an error response tuple"""
+    parent_submission = FilterBagSubmission.query.filter_by(
+        token=token
+    ).order_by(FilterBagSubmission.id).first()
+    if not parent_submission:
+        return None, (jsonify({'success': False, 'message': 'Invalid form link'}), 404)
+    if parent_submission.revoked_at and not parent_submission.submitted:
+        return None, (jsonify({'success': False, 'message': 'This form link has been cancelled'}), 410)
+    if is_token_expired(parent_submission):
+        return None, (jsonify({'success': False, 'message': 'This form link has expired'}), 410)
+    if edit_window_closed(parent_submission):
+        return None, (jsonify({'success': False, 'message': 'This submission can no longer be edited'}), 410)
+    return parent_submission, None
+
+
+@bp.route('/api/form/<token>/draft', methods=['GET'])
+def get_draft(token):
+    """Current autosaved draft for a form"""
+    parent_submission, error = open_form_parent(token)
+    if error:
+        return error
+    draft = db.session.get(FormDraft, token)
+    return jsonify({
+        'success': True,
+        'draft': json.loads(draft.data) if draft else None,
+        'version': draft.version if draft else 0
+    })
+
+
+@bp.route('/api/form/<token>/draft', methods=['PATCH'])
+def save_draft(token):
+    """Merge a small patch of changed fields into the stored draft: {"changes": {"path": value}}"""
+    try:
+        parent_submission, error = open_form_parent(token)
+        if error:
+            return error
+
+        data = request.get_json(silent=True) or {}
+        changes = data.get('changes')
+        if not isinstance(changes, dict) or not changes:
+            return jsonify({'success': False, 'message': 'No changes provided'}), 400
+
+        max_bags = current_app.config['MAX_BAGS_PER_SUBMISSION']
+        # Optimistic concurrency: retry if another tab saved between our read and write
+        for _ in range(3):
+            draft = db.session.get(FormDraft, token)
+            if draft:
+                draft_data = json.loads(draft.data)
+            elif parent_submission.submitted:
+                # Edit & Re-Submit: the page was seeded from the record, so the patch applies to that
+                draft_data = specs_to_draft(*current_bag_specs(parent_submission))
+            else:
+                draft_data = {}
+
+            error_message = apply_draft_patch(draft_data, changes, max_bags)
+            if error_message:
+                return jsonify({'success': False, 'message': error_message}), 400
+
+            encoded = json.dumps(draft_data, separators=(',', ':'), ensure_ascii=False)
+            if len(encoded) > current_app.config['MAX_DRAFT_SIZE']:
+                return jsonify({'success': False, 'message': 'Draft is too large'}), 413
+
+            now = datetime.utcnow()
+            if draft is None:
+                try:
+                    db.session.add(FormDraft(token=token, data=encoded, version=1, updated_at=now))
+                    db.session.commit()
+                    version = 1
+                    break
+                except IntegrityError:
+                    db.session.rollback()
+                    continue
+
+            version = draft.version + 1
+            updated = FormDraft.query.filter_by(token=token, version=draft.version).update({
+                FormDraft.data: encoded,
+                FormDraft.version: version,
+                FormDraft.updated_at: now
+            }, synchronize_session=False)
+            db.session.commit()
+            if updated:
+                break
+            db.session.expire_all()
+        else:
+            return jsonify({'success': False, 'message': 'Draft is being edited elsewhere, please retry'}), 409
+
+        form_page_cache.invalidate_token(token)
+        return jsonify({'success': True, 'version': version})
+
+    except RequestEntityTooLarge as e:
+        return payload_too_large(e)
+    except Exception as e:
+        logger.exception("save_draft failed")
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+
+
+@bp.route('/api/submit-form/<token>', methods=['POST'])
+def submit_form(token):
+    mail_slot = None
+    try:
+        idempotency_key = (request.headers.get('Idempotency-Key') or '').strip()[:64] or None
+
+        # The parent request row is the first row created for the token
+        parent_submission = FilterBagSubmission.query.filter_by(
+            token=token
+        ).order_by(FilterBagSubmission.id).first()
+
+        if not parent_submission:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid form link or already submitted'
+            }), 404
+
+        if parent_submission.submitted and is_replayed_submission(parent_submission, idempotency_key):
+            return replayed_submission_response(parent_submission)
+
+        if parent_submission.revoked_at and not parent_submission.submitted:
+            return jsonify({
+                'success': False,
+                'message': 'This form link has been cancelled. Please contact us if you still need to send specifications.'
+            }), 410
+
+        if is_token_expired(parent_submission):
+            return jsonify({
+                'success': False,
+                'message': 'This form link has expired. Please contact us for a new link.'
+            }), 410
+
+        if edit_window_closed(parent_submission):
+            return jsonify({
+                'success': False,
+                'message': 'This submission can no longer be edited. Please contact us if your specifications have changed.'
+            }), 410
+
+        data = request.get_json(silent=True) or {}
+
+        # Autosaved forms only send a commit marker - the bags come from the stored draft
+        draft = None
+        if data.get('commit_draft'):
+            draft = db.session.get(FormDraft, token)
+            if not draft:
+                return jsonify({
+                    'success': False,
+                    'message': 'No saved draft found. Please submit the form again.'
+                }), 400
+            if data.get('draft_version') and data['draft_version'] != draft.version:
+                return jsonify({
+                    'success': False,
+                    'message': 'Your draft changed while submitting. Please try again.',
+                    'draft_version': draft.version
+                }), 409
+            data = draft_to_payload(json.loads(draft.data))
+
+        bags = data.get('bags') or []
+
+        if not isinstance(bags, list) or not bags:
+            return jsonify({
+                'success': False,
+                'message': 'Please add bag specification'
+            }), 400
+
+        max_bags = current_app.config['MAX_BAGS_PER_SUBMISSION']
+        if len(bags) > max_bags:
+            return jsonify({
+                'success': False,
+                'message': f'A submission can contain at most {max_bags} bags'
+            }), 400
+
+        cleaned_bags = []
+        for number, bag in enumerate(bags, 1):
+            cleaned, error = validate_bag(bag, number)
+            if error:
+                return jsonify({'success': False, 'message': error}), 400
+            cleaned_bags.append(cleaned)
+
+        remarks = data.get('global_remarks')
+        if remarks is not None:
+            remarks = str(remarks).strip()[:5000] or None
+
+        mail_slot = reserve_mail_slot()
+
+        submitted_at = datetime.utcnow()
+        bag_submissions = [
+            FilterBagSubmission(
+                token=token,
+                recipient_email=parent_submission.recipient_email,
+                po_number=parent_submission.po_number,
+
+                # ✅ ADMIN DATA COPY
+                admin_quantity=parent_submission.admin_quantity,
+                admin_size=parent_submission.admin_size,
+
+                # Bag data
+                bag_type=bag['bag_type'],
+                collar_od=bag['collar_od'],
+                collar_id=bag['collar_id'],
+                tubesheet_data=bag['tubesheet_data'],
+                tubesheet_dia=bag['tubesheet_dia'],
+
+                # Client data
+                client_name=bag['client_name'],
+                client_email=bag['client_email'],
+
+                # ✅ IMPORTANT: Quantity = Admin Quantity
+                quantity=parent_submission.admin_quantity,
+
+                delivery_date=None,
+                remarks=remarks,
+
+                submitted=True,
+                submitted_at=submitted_at
+            )
+            for bag in cleaned_bags
+        ]
+
+        new_specs = [bag_spec(bag) for bag in cleaned_bags]
+        is_resubmission = bool(parent_submission.submitted)
+
+        if is_resubmission:
+            previous_revision = parent_submission.current_revision or 0
+            previous_specs, previous_remarks = current_bag_specs(parent_submission)
+            changes = diff_bag_specs(previous_specs, previous_remarks, new_specs, remarks)
+            if not changes:
+                return jsonify({
+                    'success': True,
+                    'message': 'No changes found - your submission is already up to date.',
+                    'bags_count': len(previous_specs),
+                    'unchanged': True
+                })
+
+            # Rows submitted before revisions existed get their original stored as revision 1
+            next_revision = previous_revision + 1 if previous_revision else 2
+
+            # Claim the next revision number; a concurrent edit of the same revision matches 0 rows
+            claimed = FilterBagSubmission.query.filter(
+                FilterBagSubmission.id == parent_submission.id,
+                FilterBagSubmission.submitted == True,
+                db.func.coalesce(FilterBagSubmission.current_revision, 0) == previous_revision
+            ).update({
+                FilterBagSubmission.current_revision: next_revision,
+                FilterBagSubmission.submitted_at: submitted_at
+            }, synchronize_session=False)
+
+            if not claimed:
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'message': 'This submission was changed meanwhile. Please reload the form and try again.'
+                }), 409
+
+            if previous_revision == 0:
+                db.session.add(SubmissionRevision(
+                    token=token,
+                    revision=1,
+                    bags=json.dumps(previous_specs, separators=(',', ':')),
+                    remarks=previous_remarks,
+                    created_at=parent_submission.submitted_at
+                ))
+
+            # The bag rows always hold the latest revision
+            old_bag_ids = [row_id for (row_id,) in db.session.query(FilterBagSubmission.id).filter(
+                FilterBagSubmission.token == token,
+                FilterBagSubmission.id != parent_submission.id
+            )]
+            # A digest still waiting on the old rows is moved to the new ones below
+            queued_since = db.session.query(db.func.min(PendingNotification.created_at)).filter(
+                PendingNotification.submission_id.in_(old_bag_ids)
+            ).scalar() if old_bag_ids else None
+            if queued_since:
+                PendingNotification.query.filter(
+                    PendingNotification.submission_id.in_(old_bag_ids)
+                ).delete(synchronize_session=False)
+            FilterBagSubmission.query.filter(
+                FilterBagSubmission.id.in_(old_bag_ids)
+            ).delete(synchronize_session=False)
+
+            counter_changes = {}
+            for spec in previous_specs:
+                key = ('bag_type', spec['bag_type'])
+                counter_changes[key] = counter_changes.get(key, 0) - 1
+            for spec in new_specs:
+                key = ('bag_type', spec['bag_type'])
+                counter_changes[key] = counter_changes.get(key, 0) + 1
+        else:
+            next_revision = 1
+            changes = []
+            queued_since = None
+
+            # Claim the request with one conditional UPDATE - only one concurrent POST can match submitted = 0
+            claimed = FilterBagSubmission.query.filter(
+                FilterBagSubmission.id == parent_submission.id,
+                FilterBagSubmission.submitted == False,
+                FilterBagSubmission.revoked_at.is_(None)
+            ).update({
+                FilterBagSubmission.submitted: True,
+                FilterBagSubmission.submitted_at: submitted_at,
+                FilterBagSubmission.idempotency_key: idempotency_key,
+                FilterBagSubmission.current_revision: 1
+            }, synchronize_session=False)
+
+            if not claimed:
+                db.session.rollback()
+                db.session.refresh(parent_submission)
+                if is_replayed_submission(parent_submission, idempotency_key):
+                    return replayed_submission_response(parent_submission)
+                return jsonify({
+                    'success': False,
+                    'message': 'Invalid form link or already submitted'
+                }), 409
+
+            counter_changes = submission_counter_changes(parent_submission.created_at, submitted_at, bag_submissions)
+
+        revision = next_revision
+        db.session.add(SubmissionRevision(
+            token=token,
+            revision=revision,
+            bags=json.dumps(new_specs, separators=(',', ':')),
+            remarks=remarks,
+            idempotency_key=idempotency_key,
+            created_at=submitted_at
+        ))
+
+        # All bags, the revision and the parent update commit together
+        db.session.add_all(bag_submissions)
+        if queued_since:
+            db.session.flush()
+            db.session.add_all([
+                PendingNotification(submission_id=bag.id, po_number=bag.po_number, created_at=queued_since)
+                for bag in bag_submissions
+            ])
+        FormDraft.query.filter_by(token=token).delete(synchronize_session=False)
+        change_feed.record(token, 'resubmitted' if is_resubmission else 'submitted')
+
+        bump_counters(counter_changes)
+        refresh_po_summary(parent_submission.po_number)
+        db.session.commit()
+        form_page_cache.invalidate_token(token)
+
+        # One admin + one client notification for the whole submission
+        if mail_executor.enabled:
+            detach_for_mail(*bag_submissions)
+        if is_resubmission:
+            mail_slot.send(send_resubmission_emails, bag_submissions, changes, revision)
+        else:
+            mail_slot.send(send_submission_emails, bag_submissions)
+
+        bag_count = len(bag_submissions)
+        return jsonify({
+            'success': True,
+            'message': f'Successfully {"updated" if is_resubmission else "submitted"} {bag_count} bag specification{"s" if bag_count > 1 else ""}! Thank you for your response.',
+            'bags_count': bag_count,
+            'revision': revision
+        })
+
+    except RequestEntityTooLarge as e:
+        return payload_too_large(e)
+    except MailQueueFull:
+        return jsonify({
+            'success': False,
+            'message': 'Server is busy. Please try submitting again in a moment.'
+        }), 503
+    except Exception as e:
+        logger.exception("submit_form failed")
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error submitting form: {str(e)}'
+        }), 500
+    finally:
+        if mail_slot:
+            mail_slot.release()
+
+
+def is_replayed_submission(parent_submission, idempotency_key):
+    """True if a POST with this Idempotency-Key was already applied to the token"""
+    if not idempotency_key:
+        return False
+    if parent_submission.idempotency_key == idempotency_key:
+        return True
+    return db.session.query(SubmissionRevision.id).filter_by(
+        token=parent_submission.token,
+        idempotency_key=idempotency_key
+    ).first() is not None
+
+
+def replayed_submission_response(parent_submission):
+    """Replay the original success for a retried POST - nothing is stored or sent again"""
+    bag_count = FilterBagSubmission.query.filter(
+        FilterBagSubmission.token == parent_submission.token,
+        FilterBagSubmission.id != parent_submission.id
+    ).count()
+    return jsonify({
+        'success': True,
+        'message': 'This submission was already received. Thank you for your response.',
+        'bags_count': bag_count,
+        'duplicate': True
+    })
+
+
+@bp.route('/submissions')
+def view_submissions():
+    """View all submissions (admin page); ?stream=1 sends cards as rows are read, for very long listings"""
+    # Read the cursor first so a change committed while rendering is still streamed afterwards
+    change_cursor = change_feed.latest_id()
+    query = FilterBagSubmission.query.order_by(FilterBagSubmission.created_at.desc())
+
+    if request.args.get('stream') in ('1', 'true', 'yes'):
+        # stream_template_string keeps the request context alive while the rows are read
+        cards = (render_submission_card(submission) for submission in query.yield_per(500))
+        return current_app.response_class(
+            stream_template_string(SUBMISSIONS_HTML, cards=cards, change_cursor=change_cursor),
+            mimetype='text/html'
+        )
+
     return render_template_string(
-        FILTER_FORM_HTML, 
-        token=token, 
-        recipient_email=submission.recipient_email,
-        po_number=submission.po_number,
-        admin_quantity=submission.admin_quantity,
-        admin_size=submission.admin_size
+        SUBMISSIONS_HTML,
+        cards=[render_submission_card(submission) for submission in query.all()],
+        change_cursor=change_cursor
+    )
+
+
+@bp.route('/submissions/<token>/cards')
+def submission_cards(token):
+    """Dashboard cards of one token as an HTML fragment (empty once purged or archived)"""
+    submissions = FilterBagSubmission.query.filter_by(
+        token=token
+    ).order_by(FilterBagSubmission.created_at.desc()).all()
+    return ''.join(render_submission_card(submission) for submission in submissions)
+
+
+@bp.route('/api/submissions/stream')
+def stream_submission_changes():
+    """Server-Sent Events: one small JSON event per changed token after the client's cursor"""
+    try:
+        cursor = int(request.headers.get('Last-Event-ID') or request.args.get('after'))
+    except (TypeError, ValueError):
+        cursor = change_feed.latest_id()
+
+    poll_interval = current_app.config['SSE_POLL_INTERVAL']
+    heartbeat_interval = current_app.config['SSE_HEARTBEAT_INTERVAL']
+    max_duration = current_app.config['SSE_MAX_DURATION']
+    retry_ms = current_app.config['SSE_RETRY_MS']
+
+    def generate():
+        last_id = cursor
+        started = last_write = time.monotonic()
+        yield f"retry: {retry_ms}\n\n"
+
+        while time.monotonic() - started < max_duration:
+            seen_sequence = change_feed.sequence
+            changes = change_feed.changes_after(last_id)
+            # Don't hold a pooled connection while waiting
+            db.session.close()
+
+            if changes:
+                # Several changes to one token in a batch become one event
+                latest = {}
+                for change in changes:
+                    latest.pop(change.token, None)
+                    latest[change.token] = change
+                for change in latest.values():
+                    event = json.dumps({'token': change.token, 'kind': change.kind}, separators=(',', ':'))
+                    yield f"id: {change.id}\nevent: submission\ndata: {event}\n\n"
+                last_id = changes[-1].id
+                last_write = time.monotonic()
+                continue
+
+            if time.monotonic() - last_write >= heartbeat_interval:
+                yield ": keep-alive\n\n"
+                last_write = time.monotonic()
+
+            remaining = max_duration - (time.monotonic() - started)
+            change_feed.wait(seen_sequence, max(0, min(poll_interval, remaining)))
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def revision_history(token):
+    """All revisions for a token, each with its diff against the one before"""
+    revisions = SubmissionRevision.query.filter_by(token=token).order_by(SubmissionRevision.revision).all()
+    history = []
+    previous_bags, previous_remarks = [], None
+    for revision in revisions:
+        bags = json.loads(revision.bags)
+        history.append({
+            'revision': revision.revision,
+            'created_at': revision.created_at,
+            'bags': bags,
+            'remarks': revision.remarks,
+            'changes': diff_bag_specs(previous_bags, previous_remarks, bags, revision.remarks) if history else [],
+        })
+        previous_bags, previous_remarks = bags, revision.remarks
+    return history
+
+
+@bp.route('/api/submissions/<token>/revisions', methods=['GET'])
+def get_revisions(token):
+    """Revision history of a submission with compact diffs"""
+    history = revision_history(token)
+    if not history:
+        return jsonify({'success': False, 'message': 'No revisions found'}), 404
+    return jsonify({'success': True, 'current_revision': history[-1]['revision'], 'revisions': history})
+
+
+@bp.route('/submissions/<token>/history')
+def view_revision_history(token):
+    """Admin page showing what changed between revisions"""
+    parent_submission = FilterBagSubmission.query.filter_by(token=token).order_by(FilterBagSubmission.id).first()
+    history = revision_history(token)
+    if not parent_submission or not history:
+        return "<h2 style='text-align:center; padding:50px; font-family:Arial;'>No revisions found</h2>", 404
+    return render_template_string(REVISIONS_HTML, submission=parent_submission, history=history)
+
+
+BULK_ACTIONS = ('resend', 'remind', 'revoke', 'extend')
+BULK_FILTER_KEYS = {'po_number', 'older_than_days'}
+
+
+@bp.route('/api/submissions/bulk', methods=['POST'])
+def bulk_action():
+    """Act on many pending requests at once.
+
+    {"action": "resend" | "remind" | "revoke" | "extend",
+     "ids": [...]  or  "filter": {"po_number": "...", "older_than_days": N},
+     "hours": N}   # new expiry for extend (optional for resend/remind)
+    """
+    mail_slot = None
+    try:
+        data = request.get_json(silent=True) or {}
+        action = data.get('action')
+        if action not in BULK_ACTIONS:
+            return jsonify({'success': False, 'message': f'action must be one of {", ".join(BULK_ACTIONS)}'}), 400
+
+        now = datetime.utcnow()
+        # Only still-pending, not cancelled requests (parent rows) are ever touched
+        conditions = [
+            FilterBagSubmission.submitted == False,
+            FilterBagSubmission.bag_type.is_(None),
+            FilterBagSubmission.revoked_at.is_(None),
+        ]
+
+        ids = data.get('ids')
+        filters = data.get('filter')
+        if ids is not None:
+            if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+                return jsonify({'success': False, 'message': 'ids must be a list of submission ids'}), 400
+            if len(ids) > 5000:
+                return jsonify({'success': False, 'message': 'At most 5000 ids per request'}), 400
+            conditions.append(FilterBagSubmission.id.in_(ids))
+        elif isinstance(filters, dict) and filters:
+            # A typo must never widen the action to every pending request
+            unknown = set(filters) - BULK_FILTER_KEYS
+            if unknown:
+                return jsonify({'success': False, 'message': f'Unknown filter: {", ".join(sorted(unknown))}'}), 400
+            applied = 0
+            po_number = str(filters.get('po_number') or '').strip()
+            if po_number:
+                conditions.append(FilterBagSubmission.po_number == po_number)
+                applied += 1
+            if filters.get('older_than_days') is not None:
+                try:
+                    cutoff = now - timedelta(days=float(filters['older_than_days']))
+                except (TypeError, ValueError):
+                    return jsonify({'success': False, 'message': 'older_than_days must be a number'}), 400
+                conditions.append(FilterBagSubmission.created_at < cutoff)
+                applied += 1
+            if not applied:
+                return jsonify({'success': False, 'message': 'filter needs a po_number or older_than_days'}), 400
+        else:
+            return jsonify({'success': False, 'message': 'Please provide ids or a filter'}), 400
+
+        hours = data.get('hours')
+        if action == 'revoke' and hours is not None:
+            # A new expiry would re-open the link the revoke just closed
+            return jsonify({'success': False, 'message': 'hours cannot be used with revoke'}), 400
+        if hours is not None or action == 'extend':
+            try:
+                hours = float(hours if hours is not None else current_app.config['TOKEN_TTL_HOURS'])
+            except (TypeError, ValueError):
+                hours = 0
+            if not 0 < hours <= 24 * 365:
+                return jsonify({'success': False, 'message': 'hours must be between 0 and 8760'}), 400
+
+        values = {}
+        if action in ('resend', 'remind'):
+            # Mailing a link that no longer works is pointless - extend it in the same UPDATE instead
+            if hours is None:
+                conditions.append(token_live_condition(now))
+            conditions.append(FilterBagSubmission.recipient_email != 'direct-link-generated')
+            values = {
+                FilterBagSubmission.reminded_at: now,
+                FilterBagSubmission.reminder_count: db.func.coalesce(FilterBagSubmission.reminder_count, 0) + 1,
+            }
+        elif action == 'revoke':
+            values = {FilterBagSubmission.revoked_at: now, FilterBagSubmission.expires_at: now}
+        if hours is not None:
+            values[FilterBagSubmission.expires_at] = now + timedelta(hours=hours)
+
+        rows = db.session.query(
+            FilterBagSubmission.id, FilterBagSubmission.token,
+            FilterBagSubmission.recipient_email, FilterBagSubmission.po_number
+        ).filter(*conditions).order_by(FilterBagSubmission.id).all()
+        if not rows:
+            return jsonify({'success': True, 'action': action, 'matched': 0, 'message': 'No matching pending requests'})
+
+        if action in ('resend', 'remind'):
+            mail_slot = reserve_mail_slot()
+
+        # One set-based UPDATE; the conditions are repeated so a row submitted meanwhile is left alone.
+        # Rows are then re-read by the value just written, so only rows actually changed are mailed.
+        marker = {
+            'resend': FilterBagSubmission.reminded_at,
+            'remind': FilterBagSubmission.reminded_at,
+            'revoke': FilterBagSubmission.revoked_at,
+            'extend': FilterBagSubmission.expires_at,
+        }[action]
+        rows_by_id = {row.id: row for row in rows}
+        matched_ids = list(rows_by_id)
+        updated_rows = []
+        for start in range(0, len(matched_ids), 500):
+            chunk = matched_ids[start:start + 500]
+            FilterBagSubmission.query.filter(
+                FilterBagSubmission.id.in_(chunk), *conditions
+            ).update(values, synchronize_session=False)
+            updated_rows.extend(
+                rows_by_id[row_id] for (row_id,) in db.session.query(FilterBagSubmission.id).filter(
+                    FilterBagSubmission.id.in_(chunk), marker == values[marker]
+                ).order_by(FilterBagSubmission.id)
+            )
+        updated = len(updated_rows)
+        change_feed.record_many({row.token for row in updated_rows}, {'resend': 'resent', 'remind': 'reminded',
+                                                                      'revoke': 'revoked', 'extend': 'extended'}[action])
+        db.session.commit()
+        for row in updated_rows:
+            form_page_cache.invalidate_token(row.token)
+
+        emails_queued = 0
+        if mail_slot and updated_rows:
+            recipients = [(row.recipient_email, row.token, row.po_number) for row in updated_rows]
+            mail_slot.send(send_form_emails_bulk, recipients, action == 'remind')
+            emails_queued = len(recipients)
+
+        return jsonify({
+            'success': True,
+            'action': action,
+            'matched': updated,
+            'emails_queued': emails_queued,
+            'message': f'{action.title()}: {updated} pending request(s) updated'
+                       + (f', {emails_queued} email(s) {"queued" if mail_executor.enabled else "sent"}' if emails_queued else '')
+        })
 
-    )
+    except MailQueueFull:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': 'Mail queue is full. Please try again in a moment.'
+        }), 503
+    except Exception as e:
+        logger.exception("bulk_action failed")
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+    finally:
+        if mail_slot:
+            mail_slot.release()
 
 
-@app.route('/api/submit-form/<token>', methods=['POST'])
-def submit_form(token):
+@bp.route('/api/po/<path:po_number>', methods=['GET'])
+def get_po(po_number):
+    """Roll-up and every request (with bag specs) for one purchase order"""
     try:
-        parent_submission = FilterBagSubmission.query.filter_by(
-            token=token,
-            submitted=False
-        ).first()
+        summary = get_po_summary(po_number)
+        if summary is None:
+            return jsonify({'success': False, 'message': 'No requests found for this PO'}), 404
 
-        if not parent_submission:
-            return jsonify({
-                'success': False,
-                'message': 'Invalid form link or already submitted'
-            }), 404
+        requests_list = po_requests(po_number)
+        summary['expired'] = sum(1 for entry in requests_list if entry['expired'])
 
-        data = request.get_json()
-        bags = data.get('bags', [])
+        return jsonify({'success': True, 'summary': summary, 'requests': requests_list})
+    except Exception as e:
+        logger.exception("get_po failed")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
-        if not bags:
-            return jsonify({
-                'success': False,
-                'message': 'Please add bag specification'
-            }), 400
 
-        # ✅ SINGLE BAG ONLY
-        bag = bags[0]
+@bp.route('/po/<path:po_number>')
+def view_po(po_number):
+    """Admin page for one purchase order"""
+    summary = get_po_summary(po_number)
+    if summary is None:
+        return "<h2 style='text-align:center; padding:50px; font-family:Arial;'>No requests found for this PO</h2>", 404
+    requests_list = po_requests(po_number)
+    summary['expired'] = sum(1 for entry in requests_list if entry['expired'])
+    return render_template_string(PO_HTML, summary=summary, requests=requests_list)
 
-        bag_submission = FilterBagSubmission(
-            token=token,
-            recipient_email=parent_submission.recipient_email,
-            po_number=parent_submission.po_number,
 
-            # ✅ ADMIN DATA COPY
-            admin_quantity=parent_submission.admin_quantity,
-            admin_size=parent_submission.admin_size,
+@bp.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Dashboard statistics from the precomputed counters (cached in memory for STATS_CACHE_TTL)"""
+    try:
+        return jsonify({'success': True, 'stats': stats_cache.get_or_compute(compute_stats)})
+    except Exception as e:
+        logger.exception("get_stats failed")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
-            # Bag data
-            bag_type=bag.get('bag_type'),
-            collar_od=bag.get('collar_od'),
-            collar_id=bag.get('collar_id'),
-            tubesheet_data=bag.get('tubesheet_data'),
-            tubesheet_dia=bag.get('tubesheet_dia'),
 
-            # Client data
-            client_name=bag.get('client_name'),
-            client_email=bag.get('client_email'),
+# Columns /api/submissions can return, and the default projection (no Text columns)
+API_FIELDS = tuple(c.name for c in FilterBagSubmission.__table__.columns)
+API_DEFAULT_FIELDS = ('id', 'token', 'po_number', 'recipient_email', 'bag_type', 'client_name',
+                      'submitted', 'created_at', 'submitted_at')
 
-            # ✅ IMPORTANT: Quantity = Admin Quantity
-            quantity=parent_submission.admin_quantity,
 
-            delivery_date=None,
-            remarks=data.get('global_remarks'),
+def dumps_compact(payload):
+    """Compact UTF-8 JSON bytes, through orjson when it is installed"""
+    if orjson is not None:
+        # Same date format as isoformat_utc(): naive datetimes are UTC, written with "Z"
+        return orjson.dumps(payload, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
+    return json.dumps(
+        payload, separators=(',', ':'), ensure_ascii=False,
+        default=lambda value: isoformat_utc(value) if isinstance(value, date) else str(value)
+    ).encode('utf-8')
 
-            submitted=True,
-            submitted_at=datetime.utcnow()
-        )
 
-        db.session.add(bag_submission)
+def json_bytes_response(body, min_gzip_size=1024):
+    """application/json response, gzip-compressed when the client accepts it and it is worth it"""
+    response = current_app.response_class(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= min_gzip_size and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
 
-        parent_submission.submitted = True
-        parent_submission.submitted_at = datetime.utcnow()
 
-        db.session.commit()
+@bp.route('/api/submissions', methods=['GET'])
+def list_submissions():
+    """Page through submissions by id: ?fields=id,po_number&after=<id>&limit=100[&submitted=1][&po_number=..][&collar_od_min=150&collar_od_max=16cm]"""
+    try:
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(API_DEFAULT_FIELDS)
+        unknown = [f for f in fields if f not in API_FIELDS]
+        if unknown:
+            return jsonify({'success': False, 'message': f'Unknown field(s): {", ".join(unknown)}'}), 400
+        if 'id' not in fields:
+            fields.insert(0, 'id')  # needed for the cursor
+
+        after = request.args.get('after', 0, type=int)
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        try:
+            ranges = parse_dimension_ranges(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        # Keyset pagination on the primary key - every page is an index range scan
+        query = FilterBagSubmission.query.with_entities(
+            *[getattr(FilterBagSubmission, f) for f in fields]
+        ).filter(FilterBagSubmission.id > after)
+
+        submitted = request.args.get('submitted')
+        if submitted is not None:
+            query = query.filter(FilterBagSubmission.submitted == (submitted in ('1', 'true', 'yes')))
+        if request.args.get('po_number'):
+            query = query.filter(FilterBagSubmission.po_number == request.args['po_number'])
+        query = query.filter(*dimension_conditions(FilterBagSubmission, ranges))
+
+        rows = query.order_by(FilterBagSubmission.id).limit(limit).all()
+
+        results = [dict(zip(fields, row)) for row in rows]
+        if 'submitted' in fields:
+            for result in results:
+                result['submitted'] = bool(result['submitted'])
+
+        return json_bytes_response(dumps_compact({
+            'success': True,
+            'results': results,
+            'count': len(results),
+            'next_after': rows[-1].id if len(rows) == limit else None
+        }))
+
+    except Exception as e:
+        logger.exception("list_submissions failed")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
-        send_submission_notification([bag_submission])
-        send_client_submission_notification([bag_submission])
+
+@bp.route('/api/submissions/search', methods=['GET'])
+def search_submissions():
+    """Ranked full-text search over client, recipient, PO, size, tubesheet data and remarks"""
+    try:
+        raw_query = request.args.get('q', '').strip()
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+        if not raw_query:
+            return jsonify({'success': False, 'message': 'Please provide a search query'}), 400
+        try:
+            ranges = parse_dimension_ranges(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        started = time.monotonic()
+        fields = ('id', 'token', 'recipient_email', 'po_number', 'bag_type', 'client_name',
+                  'client_email', 'admin_size', 'submitted', 'created_at', 'submitted_at')
+
+        if db.engine.dialect.name == 'sqlite':
+            fts_query = build_fts_query(raw_query)
+            if not fts_query:
+                return jsonify({'success': True, 'results': [], 'count': 0})
+            weights = ', '.join(str(w) for w in SEARCH_WEIGHTS)
+            params = {'query': fts_query, 'limit': limit}
+            range_sql = ''
+            for mm_column, low, high in ranges:
+                if low is not None:
+                    range_sql += f' AND s.{mm_column} >= :{mm_column}_low'
+                    params[f'{mm_column}_low'] = low
+                if high is not None:
+                    range_sql += f' AND s.{mm_column} <= :{mm_column}_high'
+                    params[f'{mm_column}_high'] = high
+            rows = db.session.execute(text(f"""
+                SELECT {', '.join('s.' + f for f in fields)}, bm25(filter_bag_submissions_fts, {weights}) AS rank
+                FROM filter_bag_submissions_fts
+                JOIN filter_bag_submissions s ON s.id = filter_bag_submissions_fts.rowid
+                WHERE filter_bag_submissions_fts MATCH :query{range_sql}
+                ORDER BY rank
+                LIMIT :limit
+            """), params).mappings().all()
+        else:
+            pattern = like_pattern(raw_query)
+            rows = db.session.query(
+                *[getattr(FilterBagSubmission, f) for f in fields]
+            ).filter(or_(
+                *[getattr(FilterBagSubmission, c).ilike(pattern, escape='\\') for c in SEARCH_COLUMNS]
+            ), *dimension_conditions(FilterBagSubmission, ranges)).order_by(
+                FilterBagSubmission.created_at.desc()
+            ).limit(limit).all()
+            rows = [row._mapping for row in rows]
+
+        results = []
+        for row in rows:
+            result = {f: row[f] for f in fields}
+            result['submitted'] = bool(result['submitted'])
+            if 'rank' in row:
+                result['rank'] = round(row['rank'], 4)
+            results.append(result)
+
+        # The archive has no full-text index - only scanned when explicitly asked for
+        if request.args.get('include_archive') in ('1', 'true', 'yes') and len(results) < limit:
+            terms = re.findall(r'\w+', raw_query)
+            archived = db.session.query(
+                *[getattr(FilterBagSubmissionArchive, f) for f in fields]
+            ).filter(and_(*[
+                or_(*[getattr(FilterBagSubmissionArchive, c).ilike(like_pattern(term), escape='\\')
+                      for c in SEARCH_COLUMNS])
+                for term in terms
+            ]), *dimension_conditions(FilterBagSubmissionArchive, ranges)).order_by(
+                FilterBagSubmissionArchive.submitted_at.desc()
+            ).limit(limit - len(results))
+            for row in archived:
+                result = dict(row._mapping)
+                result['submitted'] = bool(result['submitted'])
+                result['archived'] = True
+                results.append(result)
 
         return jsonify({
             'success': True,
-            'message': 'Successfully submitted bag specification! Thank you for your response.',
-            'bags_count': 1
+            'results': results,
+            'count': len(results),
+            'took_ms': round((time.monotonic() - started) * 1000, 2)
         })
-
     except Exception as e:
-        db.session.rollback()
-        return jsonify({
-            'success': False,
-            'message': f'Error submitting form: {str(e)}'
-        }), 500
+        logger.exception("search_submissions failed")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 
-@app.route('/submissions')
-def view_submissions():
-    """View all submissions (admin page)"""
-    submissions = FilterBagSubmission.query.order_by(FilterBagSubmission.created_at.desc()).all()
-    return render_template_string(SUBMISSIONS_HTML, submissions=submissions)
+@bp.route('/api/submissions/export', methods=['GET'])
+def export_submissions():
+    """Stream every submission as NDJSON; ?include_archive=1 appends archived rows, *_min/*_max filter sizes"""
+    include_archive = request.args.get('include_archive') in ('1', 'true', 'yes')
+    try:
+        ranges = parse_dimension_ranges(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    column_names = [c.name for c in FilterBagSubmission.__table__.columns]
+
+    def serialize(row, archived):
+        record = {}
+        for name in column_names:
+            value = getattr(row, name)
+            record[name] = isoformat_utc(value) if isinstance(value, datetime) else value
+        record['archived'] = archived
+        return json.dumps(record, ensure_ascii=False) + '\n'
+
+    def generate():
+        live = db.session.query(FilterBagSubmission).filter(
+            *dimension_conditions(FilterBagSubmission, ranges)
+        ).order_by(FilterBagSubmission.id)
+        for row in live.yield_per(500):
+            yield serialize(row, False)
+        if include_archive:
+            archived = db.session.query(FilterBagSubmissionArchive).filter(
+                *dimension_conditions(FilterBagSubmissionArchive, ranges)
+            ).order_by(FilterBagSubmissionArchive.id)
+            for row in archived.yield_per(500):
+                yield serialize(row, True)
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=submissions.ndjson'}
+    )
+
+
+@bp.route('/api/mail-executor', methods=['GET'])
+def mail_executor_stats():
+    """Queue depth and task latency of the background mail executor"""
+    return jsonify({'success': True, 'stats': mail_executor.stats()})
+
+
+@bp.route('/api/page-caches', methods=['GET'])
+def page_cache_stats():
+    """Size and hit rate of the in-memory form page and dashboard card caches (this worker only)"""
+    return jsonify({
+        'success': True,
+        'caches': {cache.name: cache.stats() for cache in (form_page_cache, card_cache)}
+    })
+
 
+@bp.route('/api/smtp-accounts', methods=['GET'])
+def smtp_account_stats():
+    """Usage and availability of each configured SMTP account (no credentials)"""
+    return jsonify({'success': True, 'accounts': smtp_pool.stats()})
 
-@app.route('/api/sizes', methods=['POST'])
+
+@bp.route('/api/sizes', methods=['POST'])
 def add_size():
     """Add a new bag size"""
     try:
-        data = request.get_json()
-        size_name = data.get('size_name', '').strip()
-        bag_type = data.get('bag_type', '').strip()
-        
-        if not size_name or not bag_type:
-            return jsonify({'success': False, 'message': 'Size name and bag type required'}), 400
+        data = request.get_json(silent=True) or {}
+        size, error_message = validate_size(data.get('size_name'), data.get('bag_type'))
+        if error_message:
+            return jsonify({'success': False, 'message': error_message}), 400
+        size_name, bag_type = size
         
         # Check if size already exists
         existing = BagSize.query.filter_by(size_name=size_name, bag_type=bag_type).first()
@@ -648,7 +4059,12 @@ def add_size():
         
         new_size = BagSize(size_name=size_name, bag_type=bag_type)
         db.session.add(new_size)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'This size already exists'}), 400
+        size_index.add(new_size.bag_type, new_size.id, new_size.size_name)
         
         return jsonify({
             'success': True,
@@ -656,10 +4072,165 @@ def add_size():
             'size': {'id': new_size.id, 'size_name': new_size.size_name, 'bag_type': new_size.bag_type}
         })
     except Exception as e:
+        logger.exception("add_size failed")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+
+
+def parse_size_rows(default_bag_type=None):
+    """(size_name, bag_type) pairs from an uploaded/posted CSV or JSON catalog, in file order"""
+    upload = request.files.get('file')
+    if upload:
+        raw = upload.read()
+        is_json = upload.filename.lower().endswith('.json') or upload.mimetype == 'application/json'
+    else:
+        raw = request.get_data()
+        is_json = request.mimetype == 'application/json'
+
+    if is_json:
+        data = json.loads(raw or b'null')
+        if isinstance(data, dict):
+            data = data.get('sizes')
+        if not isinstance(data, list):
+            raise ValueError('Expected a JSON list of {"size_name", "bag_type"} objects')
+        records = data
+    else:
+        # CSV with a size_name[,bag_type] header; a single column uses ?bag_type=
+        records = list(csv.DictReader(io.StringIO(raw.decode('utf-8-sig'))))
+
+    rows = []
+    for number, record in enumerate(records, 1):
+        if isinstance(record, str):
+            record = {'size_name': record}
+        if not isinstance(record, dict):
+            raise ValueError(f'Row {number}: expected an object')
+        size, error_message = validate_size(record.get('size_name'), record.get('bag_type') or default_bag_type)
+        if error_message:
+            raise ValueError(f'Row {number}: {error_message}')
+        rows.append(size)
+    return rows
+
+
+def insert_sizes_ignoring_existing(rows):
+    """Insert (size_name, bag_type) pairs in the caller's transaction, skipping ones already stored"""
+    rows = list(dict.fromkeys(rows))  # de-duplicate within the file first, keep order
+    if not rows:
+        return 0
+
+    now = datetime.utcnow()
+    values = [{'size_name': name, 'bag_type': bag_type, 'created_at': now} for name, bag_type in rows]
+    added = 0
+
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_dialect.insert if dialect == 'sqlite' else postgresql_dialect.insert
+        # One multi-row INSERT per chunk, so rowcount is exactly the rows not skipped by ON CONFLICT
+        for start in range(0, len(values), 250):
+            statement = insert(BagSize).values(values[start:start + 250])
+            added += db.session.execute(
+                statement.on_conflict_do_nothing(index_elements=['size_name', 'bag_type'])
+            ).rowcount
+    else:
+        existing = set(db.session.query(BagSize.size_name, BagSize.bag_type).filter(
+            BagSize.bag_type.in_({bag_type for _, bag_type in rows})
+        ))
+        new_values = [v for v in values if (v['size_name'], v['bag_type']) not in existing]
+        if new_values:
+            db.session.execute(BagSize.__table__.insert(), new_values)
+        added = len(new_values)
+
+    return added
+
+
+@bp.route('/api/sizes/import', methods=['POST'])
+def import_sizes():
+    """Bulk add sizes from CSV or JSON in one transaction; sizes already in the catalog are skipped"""
+    try:
+        try:
+            rows = parse_size_rows(request.args.get('bag_type'))
+        except (ValueError, UnicodeDecodeError) as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        if not rows:
+            return jsonify({'success': False, 'message': 'No sizes found in the upload'}), 400
+
+        added = insert_sizes_ignoring_existing(rows)
+        db.session.commit()
+        size_index.invalidate()
+
+        return jsonify({
+            'success': True,
+            'message': f'Imported {added} new size(s), {len(rows) - added} already present',
+            'added': added,
+            'skipped': len(rows) - added
+        })
+    except RequestEntityTooLarge as e:
+        return payload_too_large(e)
+    except Exception as e:
+        logger.exception("import_sizes failed")
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+
+
+@bp.route('/api/sizes/export', methods=['GET'])
+def export_sizes():
+    """Stream the whole catalog as CSV (default) or NDJSON (?format=ndjson)"""
+    as_ndjson = request.args.get('format') == 'ndjson'
+    query = db.session.query(BagSize.id, BagSize.size_name, BagSize.bag_type).order_by(BagSize.bag_type, BagSize.id)
+
+    def generate():
+        if as_ndjson:
+            for row in query.yield_per(1000):
+                yield json.dumps({'id': row.id, 'size_name': row.size_name, 'bag_type': row.bag_type},
+                                 ensure_ascii=False) + '\n'
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('size_name', 'bag_type'))
+        for row in query.yield_per(1000):
+            writer.writerow((row.size_name, row.bag_type))
+            if buffer.tell() > 8192:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    extension, mimetype = ('ndjson', 'application/x-ndjson') if as_ndjson else ('csv', 'text/csv')
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=bag_sizes.{extension}'}
+    )
+
+
+@bp.route('/api/sizes/batch-delete', methods=['POST'])
+def batch_delete_sizes():
+    """Delete many sizes in one transaction: {"ids": [1, 2, 3]}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        ids = data.get('ids')
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            return jsonify({'success': False, 'message': 'Please provide a list of size ids'}), 400
+
+        ids = list(set(ids))
+        deleted = 0
+        for start in range(0, len(ids), 500):
+            deleted += BagSize.query.filter(
+                BagSize.id.in_(ids[start:start + 500])
+            ).delete(synchronize_session=False)
+        db.session.commit()
+        size_index.invalidate()
+
+        return jsonify({'success': True, 'message': f'Deleted {deleted} size(s)', 'deleted': deleted})
+    except RequestEntityTooLarge as e:
+        return payload_too_large(e)
+    except Exception as e:
+        logger.exception("batch_delete_sizes failed")
+        db.session.rollback()
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 
-@app.route('/api/sizes/<bag_type>', methods=['GET'])
+@bp.route('/api/sizes/<bag_type>', methods=['GET'])
 def get_sizes(bag_type):
     """Get all sizes for a specific bag type"""
     try:
@@ -669,10 +4240,23 @@ def get_sizes(bag_type):
             'sizes': [{'id': s.id, 'size_name': s.size_name} for s in sizes]
         })
     except Exception as e:
+        logger.exception("get_sizes failed")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+
+
+@bp.route('/api/sizes/<bag_type>/suggest', methods=['GET'])
+def suggest_sizes(bag_type):
+    """Autocomplete: sizes of a bag type starting with (then containing) ?q=, at most ?limit="""
+    try:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        suggestions = size_index.suggest(bag_type, request.args.get('q', ''), limit)
+        return jsonify({'success': True, 'suggestions': suggestions, 'count': len(suggestions)})
+    except Exception as e:
+        logger.exception("suggest_sizes failed")
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 
-@app.route('/api/sizes/<int:size_id>', methods=['DELETE'])
+@bp.route('/api/sizes/<int:size_id>', methods=['DELETE'])
 def delete_size(size_id):
     """Delete a bag size"""
     try:
@@ -680,14 +4264,81 @@ def delete_size(size_id):
         if not size:
             return jsonify({'success': False, 'message': 'Size not found'}), 404
         
+        bag_type, size_name = size.bag_type, size.size_name
         db.session.delete(size)
         db.session.commit()
+        size_index.remove(bag_type, size_id, size_name)
         
         return jsonify({'success': True, 'message': 'Size deleted successfully'})
     except Exception as e:
+        logger.exception("delete_size failed")
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 
+# ==================== CLI COMMANDS ====================
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create missing tables (run as a release step before workers start)"""
+    init_db(current_app)
+    print("Database schema is up to date")
+
+
+@click.command('purge-expired')
+@click.option('--batch-size', default=None, type=int, help='Rows deleted per transaction')
+@click.option('--pause', default=0.05, type=float, help='Seconds to sleep between batches')
+@with_appcontext
+def purge_expired_command(batch_size, pause):
+    """Delete expired form links that were never submitted"""
+    deleted = purge_expired_tokens(batch_size or current_app.config['PURGE_BATCH_SIZE'], pause)
+    print(f"Purged {deleted} expired pending submission(s)")
+    print(f"Pruned {prune_change_log()} old dashboard change log row(s)")
+
+
+@click.command('archive-submissions')
+@click.option('--older-than-days', default=None, type=int, help='Archive rows submitted before this many days ago')
+@click.option('--batch-size', default=None, type=int, help='Rows moved per transaction')
+@click.option('--pause', default=0.05, type=float, help='Seconds to sleep between batches')
+@with_appcontext
+def archive_submissions_command(older_than_days, batch_size, pause):
+    """Move old submitted rows to the archive table"""
+    config = current_app.config
+    moved = archive_submissions(
+        older_than_days if older_than_days is not None else config['ARCHIVE_AFTER_DAYS'],
+        batch_size or config['ARCHIVE_BATCH_SIZE'],
+        pause
+    )
+    print(f"Archived {moved} submission row(s)")
+
+
+@click.command('backfill-dimensions')
+@click.option('--batch-size', default=500, type=int, help='Rows updated per transaction')
+@click.option('--pause', default=0.05, type=float, help='Seconds to sleep between batches')
+@click.option('--all', 'reparse', is_flag=True, help='Re-parse every row, not only rows missing values')
+@with_appcontext
+def backfill_dimensions_command(batch_size, pause, reparse):
+    """Parse sizes of existing rows into the numeric *_mm columns"""
+    print(f"Backfilled dimensions on {backfill_dimensions(batch_size, pause, reparse)} row(s)")
+
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    """Recompute dashboard counters from the submissions table"""
+    rebuild_counters()
+    print("Dashboard counters rebuilt")
+
+
+@click.command('flush-digest')
+@click.option('--force', is_flag=True, help='Send now, even if the digest interval has not passed')
+@with_appcontext
+def flush_digest_command(force):
+    """Send queued admin notifications once the digest is due (run from cron/scheduler)"""
+    sent = flush_admin_digest(force=force)
+    print(f"Digest sent for {sent} submission(s)" if sent else "Nothing to send")
+
+
 # ==================== HTML TEMPLATES ====================
 
 SENDER_HTML = """
@@ -1575,48 +5226,25 @@ else if (type === 'ring') {
                 });
             });
         }
-// Load sizes for a specific bag type
-async function loadBagSizes(bagNumber, bagType) {
+// Fill a bag's size datalist with catalog suggestions matching what has been typed so far
+const SIZE_LISTS = { collar: 'collarSizes', snap: 'snapSizes', ring: 'ringSizes' };
+
+async function loadBagSizes(bagNumber, bagType, query = '') {
     try {
-        const response = await fetch(`/api/sizes/${bagType}`);
+        const params = new URLSearchParams({ q: query, limit: 20 });
+        const response = await fetch(`/api/sizes/${bagType}/suggest?${params}`);
         const data = await response.json();
 
         if (!data.success) return;
 
-        // COLLAR
-        if (bagType === 'collar') {
-            const datalist = document.getElementById(`collarSizes_${bagNumber}`);
-            if (datalist) {
-                let optionsHTML = '';
-                data.sizes.forEach(size => {
-                    optionsHTML += `<option value="${size.size_name}"></option>`;
-                });
-                datalist.innerHTML = optionsHTML;
-            }
-        }
-
-        // SNAP
-        if (bagType === 'snap') {
-            const datalist = document.getElementById(`snapSizes_${bagNumber}`);
-            if (datalist) {
-                let optionsHTML = '';
-                data.sizes.forEach(size => {
-                    optionsHTML += `<option value="${size.size_name}"></option>`;
-                });
-                datalist.innerHTML = optionsHTML;
-            }
-        }
-
-        // RING
-        if (bagType === 'ring') {
-            const datalist = document.getElementById(`ringSizes_${bagNumber}`);
-            if (datalist) {
-                let optionsHTML = '';
-                data.sizes.forEach(size => {
-                    optionsHTML += `<option value="${size.size_name}"></option>`;
-                });
-                datalist.innerHTML = optionsHTML;
-            }
+        const datalist = document.getElementById(`${SIZE_LISTS[bagType]}_${bagNumber}`);
+        if (datalist) {
+            datalist.innerHTML = '';
+            data.suggestions.forEach(size => {
+                const option = document.createElement('option');
+                option.value = size.size_name;
+                datalist.appendChild(option);
+            });
         }
 
     } catch (error) {
@@ -1624,12 +5252,119 @@ async function loadBagSizes(bagNumber, bagType) {
     }
 }
 
+// Ask for fresh suggestions as the client types into a size field
+const SIZE_INPUT_TYPES = { collarOD: 'collar', collarID: 'collar', tubesheetData: 'snap', tubesheetDia: 'ring' };
+let sizeSuggestTimer = null;
+
+document.getElementById('specForm').addEventListener('input', (e) => {
+    const match = /^(collarOD|collarID|tubesheetData|tubesheetDia)_([0-9]+)$/.exec(e.target.id || '');
+    if (!match) return;
+    clearTimeout(sizeSuggestTimer);
+    sizeSuggestTimer = setTimeout(
+        () => loadBagSizes(match[2], SIZE_INPUT_TYPES[match[1]], e.target.value.trim()),
+        150
+    );
+});
+
 
         // Add bag button
 
         // Initialize with first bag
 
 
+        // ---- Draft autosave: only changed fields are sent, debounced ----
+        const savedDraft = {{ draft|tojson }};
+        let draftVersion = {{ draft_version }};
+        let pendingChanges = {};
+        let draftTimer = null;
+        let draftSaving = Promise.resolve();
+
+        const DRAFT_FIELD_IDS = {
+            collarOD: 'collar_od',
+            collarID: 'collar_id',
+            tubesheetData: 'tubesheet_data',
+            tubesheetDia: 'tubesheet_dia'
+        };
+
+        function draftPathFor(el) {
+            if (el.id === 'clientNameInput') return 'client_name';
+            if (el.id === 'globalRemarks') return 'global_remarks';
+            if (el.type === 'radio' && el.name.startsWith('bag_type_')) {
+                return `bags.${el.name.slice('bag_type_'.length)}.bag_type`;
+            }
+            const match = /^(collarOD|collarID|tubesheetData|tubesheetDia)_([0-9]+)$/.exec(el.id || '');
+            return match ? `bags.${match[2]}.${DRAFT_FIELD_IDS[match[1]]}` : null;
+        }
+
+        function queueDraftChange(el) {
+            const path = draftPathFor(el);
+            if (!path) return;
+            if (el.type === 'radio' && !el.checked) return;
+            pendingChanges[path] = el.value.trim() === '' ? null : el.value;
+            clearTimeout(draftTimer);
+            draftTimer = setTimeout(flushDraft, 800);
+        }
+
+        function flushDraft() {
+            clearTimeout(draftTimer);
+            const changes = pendingChanges;
+            pendingChanges = {};
+            if (!Object.keys(changes).length) return draftSaving;
+
+            draftSaving = draftSaving.then(async () => {
+                try {
+                    const response = await fetch('/api/form/{{ token }}/draft', {
+                        method: 'PATCH',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ changes: changes })
+                    });
+                    const data = await response.json();
+                    if (data.success) {
+                        draftVersion = data.version;
+                    } else {
+                        draftVersion = 0;  // fall back to posting the full form
+                    }
+                } catch (error) {
+                    draftVersion = 0;
+                    console.error('Draft save failed:', error);
+                }
+            });
+            return draftSaving;
+        }
+
+        function restoreDraft(draft) {
+            const container = document.getElementById('bagSpecsContainer');
+            const numbers = Object.keys(draft.bags || {}).sort((a, b) => a - b);
+            if (!numbers.length) numbers.push('1');
+
+            container.innerHTML = numbers.map(n => createBagCard(n)).join('');
+            numbers.forEach(n => {
+                attachBagTypeListeners(n);
+                const bag = (draft.bags || {})[n] || {};
+                if (bag.bag_type) {
+                    const card = document.querySelector(`[data-bag="${n}"][data-type="${bag.bag_type}"]`);
+                    if (card) card.click();
+                }
+                Object.entries(DRAFT_FIELD_IDS).forEach(([prefix, field]) => {
+                    const input = document.getElementById(`${prefix}_${n}`);
+                    if (input && bag[field]) input.value = bag[field];
+                });
+            });
+            bagCounter = Math.max(...numbers.map(Number));
+
+            if (draft.client_name) document.getElementById('clientNameInput').value = draft.client_name;
+            if (draft.global_remarks) document.getElementById('globalRemarks').value = draft.global_remarks;
+        }
+
+        document.getElementById('specForm').addEventListener('input', e => queueDraftChange(e.target));
+        document.getElementById('specForm').addEventListener('change', e => queueDraftChange(e.target));
+        window.addEventListener('pagehide', flushDraft);
+
+        // One key per page load - a retried or double-clicked submit is recognised by the server
+        const idempotencyKey = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : Date.now().toString(36) + Math.random().toString(36).slice(2);
+
         // Form submission
         document.getElementById('specForm').addEventListener('submit', async (e) => {
             e.preventDefault();
@@ -1719,11 +5454,24 @@ else if (bagType === 'ring') {
             };
             
             try {
-                const response = await fetch('/api/submit-form/{{ token }}', {
+                // The server already holds the autosaved draft - just ask it to commit that version
+                await flushDraft();
+                const submitBody = draftVersion
+                    ? { commit_draft: true, draft_version: draftVersion }
+                    : formData;
+
+                let response = await fetch('/api/submit-form/{{ token }}', {
                     method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify(formData)
+                    headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
+                    body: JSON.stringify(submitBody)
                 });
+                if (submitBody.commit_draft && (response.status === 400 || response.status === 409)) {
+                    response = await fetch('/api/submit-form/{{ token }}', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
+                        body: JSON.stringify(formData)
+                    });
+                }
                 
                 const data = await response.json();
                 
@@ -1759,6 +5507,10 @@ else if (bagType === 'ring') {
         document.head.appendChild(style);
         
         document.addEventListener('DOMContentLoaded', function() {
+        if (savedDraft) {
+            restoreDraft(savedDraft);
+            return;
+        }
         const container = document.getElementById('bagSpecsContainer');
         container.innerHTML = createBagCard(1);
         attachBagTypeListeners(1);
@@ -1769,6 +5521,88 @@ else if (bagType === 'ring') {
 </html>
 """
 
+# One dashboard card, rendered through render_submission_card() so unchanged cards come from card_cache
+SUBMISSION_CARD_HTML = """
+<div class="submission-card" id="submission-{{ submission.id }}" data-token="{{ submission.token }}">
+    <div class="submission-header">
+        <div>
+            <h3>
+                {% if submission.submitted %}
+                    {{ submission.client_name or 'N/A' }}
+                {% else %}
+                    Pending Submission
+                {% endif %}
+                {% if submission.po_number %}
+                    <a class="po-badge" href="/po/{{ submission.po_number|urlencode }}">PO: {{ submission.po_number }}</a>
+                {% endif %}
+            </h3>
+            <p style="color: #666; font-size: 14px;">Sent: {{ submission.created_at.strftime('%d %b %Y, %I:%M %p') }}
+                {% if submission.current_revision and submission.current_revision > 1 %}
+                    · <a href="/submissions/{{ submission.token }}/history">✏️ Revision {{ submission.current_revision }} - view changes</a>
+                {% endif %}
+            </p>
+        </div>
+        <span class="badge {% if submission.submitted %}badge-success{% elif expired %}badge-expired{% else %}badge-pending{% endif %}">
+            {% if submission.submitted %}✓ Submitted{% elif submission.revoked_at %}🚫 Cancelled{% elif expired %}⌛ Expired{% else %}⏳ Pending{% endif %}
+        </span>
+    </div>
+    
+    <div class="detail-row">
+        <div class="detail-label">Recipient Email</div>
+        <div>{{ submission.recipient_email }}</div>
+    </div>
+    
+    {% if submission.submitted %}
+        <div class="detail-row">
+            <div class="detail-label">Bag Type</div>
+            <div>{{ submission.bag_type.title() if submission.bag_type else 'N/A' }}</div>
+        </div>
+        
+        <div class="detail-row">
+            <div class="detail-label">Client Email</div>
+            <div>{{ submission.client_email or 'N/A' }}</div>
+        </div>
+        
+        <div class="detail-row">
+            <div class="detail-label">Quantity</div>
+            <div>{{ submission.quantity or 'N/A' }}</div>
+        </div>
+        
+        {% if submission.bag_type == 'collar' %}
+            <div class="detail-row">
+                <div class="detail-label">Collar OD</div>
+                <div>{{ submission.collar_od or 'N/A' }}{% if matches.collar_od %} <span class="catalog-match">≈ catalog {{ matches.collar_od.label }}</span>{% endif %}</div>
+            </div>
+            <div class="detail-row">
+                <div class="detail-label">Collar ID</div>
+                <div>{{ submission.collar_id or 'N/A' }}{% if matches.collar_id %} <span class="catalog-match">≈ catalog {{ matches.collar_id.label }}</span>{% endif %}</div>
+            </div>
+        {% elif submission.bag_type == 'snap' %}
+            <div class="detail-row">
+                <div class="detail-label">Tubesheet Data</div>
+                <div>{{ submission.tubesheet_data or 'N/A' }}{% if matches.tubesheet_data %} <span class="catalog-match">≈ catalog {{ matches.tubesheet_data.label }}</span>{% endif %}</div>
+            </div>
+        {% elif submission.bag_type == 'ring' %}
+            <div class="detail-row">
+                <div class="detail-label">Tubesheet Diameter</div>
+                <div>{{ submission.tubesheet_dia or 'N/A' }}{% if matches.tubesheet_dia %} <span class="catalog-match">≈ catalog {{ matches.tubesheet_dia.label }}</span>{% endif %}</div>
+            </div>
+        {% endif %}
+        
+        <div class="detail-row">
+            <div class="detail-label">Submitted At</div>
+            <div>
+                {% if submission.submitted_at %}
+                    {{ submission.submitted_at.strftime('%d %b %Y, %I:%M %p') }}
+                {% else %}
+                    N/A
+                {% endif %}
+            </div>
+        </div>
+    {% endif %}
+</div>
+"""
+
 SUBMISSIONS_HTML = """
 <!DOCTYPE html>
 <html lang="en">
@@ -1790,10 +5624,17 @@ SUBMISSIONS_HTML = """
         .badge { padding: 5px 15px; border-radius: 20px; font-size: 14px; font-weight: 600; }
         .badge-success { background: #d4edda; color: #155724; }
         .badge-pending { background: #fff3cd; color: #856404; }
+        .badge-expired { background: #e2e3e5; color: #383d41; }
         .detail-row { display: grid; grid-template-columns: 200px 1fr; gap: 10px; margin: 10px 0; }
         .detail-label { font-weight: 600; color: #555; }
         .empty-state { text-align: center; padding: 60px 20px; color: #666; }
-        .po-badge { background: #ffc107; color: #000; padding: 5px 12px; border-radius: 5px; font-weight: 600; font-size: 14px; margin-left: 10px; }
+        .catalog-match { color: #1f7a3f; font-size: 13px; margin-left: 8px; }
+        .po-badge { text-decoration: none; background: #ffc107; color: #000; padding: 5px 12px; border-radius: 5px; font-weight: 600; font-size: 14px; margin-left: 10px; }
+        .stats-panel { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin-top: 20px; }
+        .stat-box { background: #f8f9ff; border-radius: 10px; padding: 15px; border-left: 4px solid #667eea; }
+        .stat-box .stat-label { font-size: 13px; color: #666; font-weight: 600; }
+        .stat-box .stat-value { font-size: 22px; color: #333; margin-top: 5px; }
+        .stat-box ul { list-style: none; margin-top: 5px; font-size: 14px; }
     </style>
 </head>
 <body>
@@ -1802,106 +5643,321 @@ SUBMISSIONS_HTML = """
         
         <div class="header">
             <h1>📊 All Submissions</h1>
-            <p>View all filter bag specification submissions</p>
+            <p>View all filter bag specification submissions · <a href="/submissions?stream=1">Full printable listing</a></p>
+
+            <div class="stats-panel" id="statsPanel">
+                <div class="stat-box"><div class="stat-label">⏳ Pending / ✓ Submitted</div><div class="stat-value" id="statStatus">…</div></div>
+                <div class="stat-box"><div class="stat-label">⏱️ Median time to submit (approx.)</div><div class="stat-value" id="statMedian">…</div></div>
+                <div class="stat-box"><div class="stat-label">🛍️ By bag type</div><ul id="statBagTypes"></ul></div>
+                <div class="stat-box"><div class="stat-label">📏 Top sizes requested</div><ul id="statSizes"></ul></div>
+            </div>
         </div>
         
-        <div class="submissions">
-            {% if submissions %}
-                {% for submission in submissions %}
-                <div class="submission-card">
-                    <div class="submission-header">
-                        <div>
-                            <h3>
-                                {% if submission.submitted %}
-                                    {{ submission.client_name or 'N/A' }}
-                                {% else %}
-                                    Pending Submission
-                                {% endif %}
-                                {% if submission.po_number %}
-                                    <span class="po-badge">PO: {{ submission.po_number }}</span>
-                                {% endif %}
-                            </h3>
-                            <p style="color: #666; font-size: 14px;">Sent: {{ submission.created_at.strftime('%d %b %Y, %I:%M %p') }}</p>
-                        </div>
-                        <span class="badge {% if submission.submitted %}badge-success{% else %}badge-pending{% endif %}">
-                            {% if submission.submitted %}✓ Submitted{% else %}⏳ Pending{% endif %}
-                        </span>
-                    </div>
-                    
-                    <div class="detail-row">
-                        <div class="detail-label">Recipient Email</div>
-                        <div>{{ submission.recipient_email }}</div>
-                    </div>
-                    
-                    {% if submission.submitted %}
-                        <div class="detail-row">
-                            <div class="detail-label">Bag Type</div>
-                            <div>{{ submission.bag_type.title() if submission.bag_type else 'N/A' }}</div>
-                        </div>
-                        
-                        <div class="detail-row">
-                            <div class="detail-label">Client Email</div>
-                            <div>{{ submission.client_email or 'N/A' }}</div>
-                        </div>
-                        
-                        <div class="detail-row">
-                            <div class="detail-label">Quantity</div>
-                            <div>{{ submission.quantity or 'N/A' }}</div>
-                        </div>
-                        
-                        {% if submission.bag_type == 'collar' %}
-                            <div class="detail-row">
-                                <div class="detail-label">Collar OD</div>
-                                <div>{{ submission.collar_od or 'N/A' }}</div>
-                            </div>
-                            <div class="detail-row">
-                                <div class="detail-label">Collar ID</div>
-                                <div>{{ submission.collar_id or 'N/A' }}</div>
-                            </div>
-                        {% elif submission.bag_type == 'snap' %}
-                            <div class="detail-row">
-                                <div class="detail-label">Tubesheet Data</div>
-                                <div>{{ submission.tubesheet_data or 'N/A' }}</div>
-                            </div>
-                        {% elif submission.bag_type == 'ring' %}
-                            <div class="detail-row">
-                                <div class="detail-label">Tubesheet Diameter</div>
-                                <div>{{ submission.tubesheet_dia or 'N/A' }}</div>
-                            </div>
-                        {% endif %}
-                        
-                        <div class="detail-row">
-                            <div class="detail-label">Submitted At</div>
-                            <div>
-                                {% if submission.submitted_at %}
-                                    {{ submission.submitted_at.strftime('%d %b %Y, %I:%M %p') }}
-                                {% else %}
-                                    N/A
-                                {% endif %}
-                            </div>
-                        </div>
-                    {% endif %}
-                </div>
-                {% endfor %}
+        <div class="submissions" id="submissionsList">
+            {# for/else so a lazily produced ``cards`` is only iterated once #}
+            {% for card in cards %}
+                {{ card }}
             {% else %}
                 <div class="empty-state">
                     <h2>📭 No Submissions Yet</h2>
                     <p>Send a form link to get started!</p>
                 </div>
-            {% endif %}
+            {% endfor %}
+        </div>
+    </div>
+    <script>
+        async function loadStats() {
+            try {
+                const response = await fetch('/api/stats');
+                const data = await response.json();
+                if (!data.success) return;
+
+                const stats = data.stats;
+                // Names are user-entered sizes and types - build text nodes, never markup
+                const fillList = (list, pairs) => {
+                    list.replaceChildren();
+                    for (const [name, count] of (pairs.length ? pairs : [['—', null]])) {
+                        const item = document.createElement('li');
+                        item.textContent = count === null ? name : `${name}: `;
+                        if (count !== null) {
+                            const strong = document.createElement('strong');
+                            strong.textContent = count;
+                            item.appendChild(strong);
+                        }
+                        list.appendChild(item);
+                    }
+                };
+
+                document.getElementById('statStatus').textContent = `${stats.pending} / ${stats.submitted}`;
+                const median = stats.median_hours_to_submit;
+                document.getElementById('statMedian').textContent = median === null ? '—'
+                    : median < 1 ? `≈ ${Math.max(1, Math.round(median * 60))} min` : `≈ ${median} h`;
+                fillList(document.getElementById('statBagTypes'), Object.entries(stats.by_bag_type));
+                fillList(document.getElementById('statSizes'), stats.top_sizes.map(s => [s.size, s.count]));
+            } catch (error) {
+                console.error('Error loading stats:', error);
+            }
+        }
+
+        loadStats();
+
+        // Live updates: each event names a token whose cards changed; fetch just those cards
+        function applySubmissionChange(token, html) {
+            const list = document.getElementById('submissionsList');
+            const existing = list.querySelectorAll(`.submission-card[data-token="${CSS.escape(token)}"]`);
+            const template = document.createElement('template');
+            template.innerHTML = html.trim();
+
+            if (existing.length) {
+                existing[0].before(template.content);
+                existing.forEach(card => card.remove());
+            } else if (template.content.childElementCount) {
+                const emptyState = list.querySelector('.empty-state');
+                if (emptyState) emptyState.remove();
+                list.prepend(template.content);
+            }
+        }
+
+        // token -> dirty flag: a change that arrives mid-refresh triggers one more refresh afterwards
+        const refreshing = new Map();
+        async function refreshToken(token) {
+            if (refreshing.has(token)) {
+                refreshing.set(token, true);
+                return;
+            }
+            try {
+                do {
+                    refreshing.set(token, false);
+                    try {
+                        const response = await fetch(`/submissions/${encodeURIComponent(token)}/cards`);
+                        if (response.ok) applySubmissionChange(token, await response.text());
+                    } catch (error) {
+                        console.error('Error refreshing submission:', error);
+                    }
+                } while (refreshing.get(token));
+            } finally {
+                refreshing.delete(token);
+            }
+        }
+
+        if (window.EventSource) {
+            const events = new EventSource('/api/submissions/stream?after={{ change_cursor }}');
+            let statsTimer = null;
+            events.addEventListener('submission', (e) => {
+                const change = JSON.parse(e.data);
+                refreshToken(change.token);
+                clearTimeout(statsTimer);
+                statsTimer = setTimeout(loadStats, 1000);
+            });
+        }
+    </script>
+</body>
+</html>
+"""
+
+REVISIONS_HTML = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Submission History</title>
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); min-height: 100vh; padding: 20px; }
+        .container { max-width: 1000px; margin: 0 auto; }
+        .back-link { display: inline-block; padding: 10px 20px; background: #667eea; color: white; text-decoration: none; border-radius: 8px; margin-bottom: 20px; }
+        .panel { background: white; padding: 30px; border-radius: 15px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); margin-bottom: 20px; }
+        .panel h1 { color: #667eea; margin-bottom: 10px; }
+        .revision { border-left: 5px solid #667eea; background: #f8f9ff; padding: 20px; border-radius: 10px; margin-top: 15px; }
+        table { width: 100%; border-collapse: collapse; margin-top: 10px; }
+        th { text-align: left; padding: 8px; background: #eef2f7; }
+        td { padding: 8px; border-bottom: 1px solid #ddd; vertical-align: top; }
+        .old { color: #a33; text-decoration: line-through; }
+        .new { color: #1a7f37; font-weight: 600; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <a href="/submissions" class="back-link">← Back to Submissions</a>
+
+        <div class="panel">
+            <h1>✏️ Submission History</h1>
+            <p>
+                {{ submission.recipient_email }}
+                {% if submission.po_number %} · PO: {{ submission.po_number }}{% endif %}
+                · {{ history|length }} revision{{ 's' if history|length > 1 }}
+            </p>
+
+            {% for entry in history|reverse %}
+            <div class="revision">
+                <h3>Revision {{ entry.revision }}{% if loop.first %} (current){% endif %}</h3>
+                <p style="color: #666; font-size: 14px;">{{ entry.created_at.strftime('%d %b %Y, %I:%M %p') if entry.created_at else 'N/A' }}</p>
+
+                {% if entry.changes %}
+                <table>
+                    <tr><th>Field</th><th>Before</th><th>After</th></tr>
+                    {% for change in entry.changes %}
+                    <tr>
+                        {% if change.change == 'added' %}
+                            <td>Bag #{{ change.bag }}</td><td>—</td><td class="new">added ({{ change.new.bag_type }})</td>
+                        {% elif change.change == 'removed' %}
+                            <td>Bag #{{ change.bag }}</td><td class="old">{{ change.old.bag_type }}</td><td>removed</td>
+                        {% else %}
+                            <td>{% if change.bag %}Bag #{{ change.bag }} - {% endif %}{{ change.field.replace('_', ' ').title() }}</td>
+                            <td class="old">{{ change.old or '—' }}</td>
+                            <td class="new">{{ change.new or '—' }}</td>
+                        {% endif %}
+                    </tr>
+                    {% endfor %}
+                </table>
+                {% else %}
+                <p>{{ entry.bags|length }} bag{{ 's' if entry.bags|length > 1 }} submitted{% if loop.last %} (original){% endif %}</p>
+                {% endif %}
+            </div>
+            {% endfor %}
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+PO_HTML = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>PO {{ summary.po_number }}</title>
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); min-height: 100vh; padding: 20px; }
+        .container { max-width: 1000px; margin: 0 auto; }
+        .back-link { display: inline-block; padding: 10px 20px; background: #667eea; color: white; text-decoration: none; border-radius: 8px; margin-bottom: 20px; }
+        .panel { background: white; padding: 30px; border-radius: 15px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); margin-bottom: 20px; }
+        .panel h1 { color: #667eea; margin-bottom: 10px; }
+        .totals { display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 15px; margin-top: 20px; }
+        .total { background: #f8f9ff; border-radius: 10px; padding: 15px; border-left: 4px solid #667eea; }
+        .total .label { font-size: 13px; color: #666; font-weight: 600; }
+        .total .value { font-size: 22px; color: #333; margin-top: 5px; }
+        .request { border-left: 5px solid #667eea; background: #f8f9ff; padding: 20px; border-radius: 10px; margin-top: 15px; }
+        .badge { padding: 5px 15px; border-radius: 20px; font-size: 14px; font-weight: 600; float: right; }
+        .badge-success { background: #d4edda; color: #155724; }
+        .badge-pending { background: #fff3cd; color: #856404; }
+        .badge-expired { background: #e2e3e5; color: #383d41; }
+        .badge-partial { background: #cce5ff; color: #004085; }
+        table { width: 100%; border-collapse: collapse; margin-top: 10px; }
+        th { text-align: left; padding: 8px; background: #eef2f7; }
+        td { padding: 8px; border-bottom: 1px solid #ddd; vertical-align: top; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <a href="/submissions" class="back-link">← Back to Submissions</a>
+
+        <div class="panel">
+            <h1>📦 PO {{ summary.po_number }}
+                <span class="badge {{ {'submitted': 'badge-success', 'partial': 'badge-partial'}.get(summary.status, 'badge-pending') }}">{{ summary.status.title() }}</span>
+            </h1>
+            <p>First sent {{ summary.first_sent_at.strftime('%d %b %Y') if summary.first_sent_at else 'N/A' }}
+                {% if summary.last_submitted_at %} · last submission {{ summary.last_submitted_at.strftime('%d %b %Y, %I:%M %p') }}{% endif %}</p>
+
+            <div class="totals">
+                <div class="total"><div class="label">Requests</div><div class="value">{{ summary.requests }}</div></div>
+                <div class="total"><div class="label">✓ Submitted</div><div class="value">{{ summary.submitted }}</div></div>
+                <div class="total"><div class="label">⏳ Pending / ⌛ Expired</div><div class="value">{{ summary.pending - summary.expired }} / {{ summary.expired }}</div></div>
+                <div class="total"><div class="label">🛍️ Bags</div><div class="value">{{ summary.bags }}</div></div>
+                <div class="total"><div class="label">By bag type</div><div class="value" style="font-size: 15px;">
+                    {% for bag_type, count in summary.bag_types.items() %}{{ bag_type.title() }}: {{ count }}<br>{% else %}—{% endfor %}
+                </div></div>
+                <div class="total"><div class="label">Admin quantity</div><div class="value">{{ summary.admin_quantity_total }}</div></div>
+            </div>
+        </div>
+
+        <div class="panel">
+            {% for entry in requests %}
+            <div class="request">
+                <span class="badge {% if entry.submitted %}badge-success{% elif entry.expired %}badge-expired{% else %}badge-pending{% endif %}">
+                    {% if entry.submitted %}✓ Submitted{% elif entry.expired %}⌛ Expired{% else %}⏳ Pending{% endif %}
+                </span>
+                <h3>{{ entry.client_name or entry.recipient_email }}</h3>
+                <p style="color: #666; font-size: 14px;">
+                    {{ entry.recipient_email }} · Sent {{ entry.created_at.strftime('%d %b %Y, %I:%M %p') if entry.created_at else 'N/A' }}
+                    {% if entry.admin_quantity or entry.admin_size %} · Ordered: {{ entry.admin_quantity or '—' }} × {{ entry.admin_size or '—' }}{% endif %}
+                    {% if entry.revision > 1 %} · <a href="/submissions/{{ entry.token }}/history">Revision {{ entry.revision }}</a>{% endif %}
+                </p>
+
+                {% if entry.bags %}
+                <table>
+                    <tr><th>#</th><th>Bag Type</th><th>Size</th></tr>
+                    {% for bag in entry.bags %}
+                    <tr>
+                        <td>{{ loop.index }}</td>
+                        <td>{{ bag.bag_type.title() if bag.bag_type else 'N/A' }}</td>
+                        <td>
+                            {% if bag.bag_type == 'collar' %}OD {{ bag.collar_od }} / ID {{ bag.collar_id }}
+                            {% elif bag.bag_type == 'snap' %}{{ bag.tubesheet_data }}
+                            {% elif bag.bag_type == 'ring' %}Ø {{ bag.tubesheet_dia }}{% endif %}
+                        </td>
+                    </tr>
+                    {% endfor %}
+                </table>
+                {% endif %}
+            </div>
+            {% endfor %}
         </div>
     </div>
 </body>
 </html>
 """
 
+# ==================== APPLICATION FACTORY ====================
+
+def create_app(config_object=Config):
+    """Build the Flask app. Does no database work - schema setup is init_db()'s job"""
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    app.json = UtcJSONProvider(app)
+
+    setup_logging(app)
+    app.before_request(start_request_timer)
+    app.after_request(log_request)
+
+    db.init_app(app)
+    configure_sqlite(app)
+    smtp_pool.init_app(app)
+    mail_executor.init_app(app)
+    form_page_cache.init_app(app)
+    card_cache.init_app(app)
+    health_monitor.init_app(app)
+    digest_flusher.init_app(app)
+    stats_cache.ttl = app.config['STATS_CACHE_TTL']
+    size_index.ttl = app.config['SIZE_INDEX_TTL']
+
+    app.register_blueprint(bp)
+    app.register_error_handler(413, payload_too_large)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(flush_digest_command)
+    app.cli.add_command(purge_expired_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(archive_submissions_command)
+    app.cli.add_command(backfill_dimensions_command)
+
+    return app
+
+
+# Module level instance for `gunicorn filter_bag_app:app`
+app = create_app()
+
 # ==================== RUN APPLICATION ====================
 
 if __name__ == '__main__':
+    init_db(app)
+
     print("=" * 60)
     print("🚀 Filter Bag Specification System - WITH MULTIPLE BAGS ✅")
     print("=" * 60)
-    print(f"📧 Sender Email: {SENDER_EMAIL}")
+    print(f"📧 Sender Email: {app.config['SENDER_EMAIL']}")
     print(f"🌐 Server starting on http://127.0.0.1:5000")
     print("=" * 60)
     print("\n📍 Available Routes:")
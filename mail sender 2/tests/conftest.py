@@ -0,0 +1,51 @@
+import os
+import sys
+
+# The app module builds its app at import time - keep it off the real database
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('MAIL_EXECUTOR_ENABLED', '0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A fresh app on its own SQLite file; outgoing mail is recorded in ``app.sent_mail``"""
+    import filter_bag_app
+
+    class TestConfig(filter_bag_app.Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "test.db"}'
+        MAIL_EXECUTOR_ENABLED = False
+        ADMIN_NOTIFY_MODE = 'immediate'
+        HEALTH_CHECK_SMTP = False
+
+    test_app = filter_bag_app.create_app(TestConfig)
+    filter_bag_app.init_db(test_app)
+    filter_bag_app.stats_cache.clear()
+
+    test_app.sent_mail = []
+    record = lambda kind: lambda *args: test_app.sent_mail.append((kind, args)) or True
+    monkeypatch.setattr(filter_bag_app, 'send_form_email', record('form'))
+    monkeypatch.setattr(filter_bag_app, 'send_form_emails_bulk', record('bulk'))
+    monkeypatch.setattr(filter_bag_app, 'send_submission_emails', record('submitted'))
+    monkeypatch.setattr(filter_bag_app, 'send_resubmission_emails', record('resubmitted'))
+    yield test_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def new_link(client):
+    """Send a form link and return its token"""
+    def create(po_number='PO1', email='client@example.com'):
+        response = client.post('/api/send-form', json={
+            'recipient_email': email, 'po_number': po_number, 'admin_quantity': 1, 'admin_size': '160'
+        })
+        assert response.status_code == 200
+        return response.get_json()['form_url'].rstrip('/').split('/')[-1]
+    return create
@@ -0,0 +1,73 @@
+from filter_bag_app import FilterBagSubmission
+
+BAGS = [{'bag_type': 'ring', 'tubesheet_dia': '160', 'client_name': 'Acme'}]
+
+
+def bulk(client, **body):
+    return client.post('/api/submissions/bulk', json=body)
+
+
+def revoked_count(app):
+    with app.app_context():
+        return FilterBagSubmission.query.filter(FilterBagSubmission.revoked_at.isnot(None)).count()
+
+
+def test_unknown_filter_key_is_rejected(app, client, new_link):
+    new_link('PO1')
+    new_link('PO2')
+    response = bulk(client, action='revoke', filter={'po': 'PO1'})
+    assert response.status_code == 400
+    assert revoked_count(app) == 0
+
+
+def test_filter_must_apply_a_condition(app, client, new_link):
+    new_link('PO1')
+    response = bulk(client, action='remind', filter={'po_number': ''})
+    assert response.status_code == 400
+    assert 'bulk' not in [kind for kind, _ in app.sent_mail]
+
+
+def test_filter_by_po_number(app, client, new_link):
+    new_link('PO1')
+    new_link('PO2')
+    response = bulk(client, action='revoke', filter={'po_number': 'PO1'})
+    assert response.get_json()['matched'] == 1
+    assert revoked_count(app) == 1
+
+
+def test_revoke_rejects_hours(app, client, new_link):
+    new_link()
+    response = bulk(client, action='revoke', ids=[1], hours=5)
+    assert response.status_code == 400
+    assert revoked_count(app) == 0
+
+
+def test_revoked_link_cannot_be_used(client, new_link):
+    token = new_link()
+    assert bulk(client, action='revoke', ids=[1]).get_json()['matched'] == 1
+
+    assert client.get(f'/form/{token}').status_code == 410
+    assert client.post(f'/api/submit-form/{token}', json={'bags': BAGS}).status_code == 410
+    assert client.patch(f'/api/form/{token}/draft', json={'changes': {'client_name': 'x'}}).status_code == 410
+
+
+def test_remind_links_without_expiry(app, client, new_link):
+    app.config['TOKEN_TTL_HOURS'] = 0
+    new_link('PO1')
+    new_link('PO1')
+
+    response = bulk(client, action='remind', filter={'po_number': 'PO1'})
+    assert response.get_json()['matched'] == 2
+    kind, (recipients, reminder) = app.sent_mail[-1]
+    assert kind == 'bulk' and reminder is True and len(recipients) == 2
+
+
+def test_submitted_requests_are_not_mailed(app, client, new_link):
+    submitted_token = new_link()
+    pending_token = new_link()
+    assert client.post(f'/api/submit-form/{submitted_token}', json={'bags': BAGS}).status_code == 200
+
+    response = bulk(client, action='resend', ids=[1, 2])
+    assert response.get_json()['matched'] == 1
+    kind, (recipients, reminder) = app.sent_mail[-1]
+    assert [token for _, token, _ in recipients] == [pending_token]
@@ -0,0 +1,62 @@
+import pytest
+
+from filter_bag_app import parse_dimension_mm
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('150', 150.0),
+    ('150mm', 150.0),
+    ('15.5 cm', 155.0),
+    ('6,5cm', 65.0),
+    ('1.2m', 1200.0),
+    ('10inch', 254.0),
+    ('6"', 152.4),
+    ('Ø 160 MM', 160.0),
+    ('150 mesh', 150.0),
+])
+def test_units(value, expected):
+    assert parse_dimension_mm(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('150x2000', 150.0),
+    ('150mmx2000', 150.0),
+    ('150 x 2000', 150.0),
+    ('150 × 2000 mm', 150.0),
+])
+def test_first_of_several_dimensions(value, expected):
+    assert parse_dimension_mm(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1,000mm', 1000.0),
+    ('1,000.5 mm', 1000.5),
+    ('6,500', 6500.0),
+])
+def test_thousands_separator(value, expected):
+    assert parse_dimension_mm(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1/2 in', 12.7),
+    ('1/2"', 12.7),
+    ('6 1/2 in', 165.1),
+])
+def test_fractions(value, expected):
+    assert parse_dimension_mm(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('160/6000', 160.0),
+    ('150/160', 150.0),
+    ('150/160 mm', 150.0),
+    ('3/4', 0.75),
+    ('5/16"', 7.938),
+])
+def test_slash_between_dimensions(value, expected):
+    assert parse_dimension_mm(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value', [None, '', 'abc', 'mm', '1/0 in'])
+def test_no_dimension(value):
+    assert parse_dimension_mm(value) is None
@@ -0,0 +1,113 @@
+import pytest
+
+import filter_bag_app
+from filter_bag_app import FilterBagSubmission, InlineMailSlot, db
+
+BAGS = [{'bag_type': 'ring', 'tubesheet_dia': '160', 'client_name': 'Acme'}]
+
+
+def submit(client, token, bags=BAGS, key=None):
+    headers = {'Idempotency-Key': key} if key else {}
+    return client.post(f'/api/submit-form/{token}', json={'bags': bags}, headers=headers)
+
+
+def bag_rows(app, token):
+    with app.app_context():
+        return FilterBagSubmission.query.filter(
+            FilterBagSubmission.token == token,
+            FilterBagSubmission.bag_type.isnot(None)
+        ).count()
+
+
+@pytest.fixture
+def meanwhile(app, monkeypatch):
+    """Run an UPDATE on the parent row from another connection between a submit's read and its claim"""
+    def install(token, **values):
+        def reserve():
+            with app.app_context():
+                table = FilterBagSubmission.__table__
+                with db.engine.begin() as connection:
+                    connection.execute(
+                        table.update().where(table.c.token == token, table.c.bag_type.is_(None)).values(**values)
+                    )
+            return InlineMailSlot()
+        monkeypatch.setattr(filter_bag_app, 'reserve_mail_slot', reserve)
+    return install
+
+
+def test_submit_stores_bags_once(app, client, new_link):
+    token = new_link()
+    response = submit(client, token, key='key-1')
+    assert response.status_code == 200
+    assert response.get_json()['revision'] == 1
+    assert bag_rows(app, token) == 1
+    assert [kind for kind, _ in app.sent_mail].count('submitted') == 1
+
+
+def test_retry_with_same_key_is_replayed(app, client, new_link):
+    token = new_link()
+    assert submit(client, token, key='key-1').status_code == 200
+
+    response = submit(client, token, key='key-1')
+    assert response.status_code == 200
+    assert response.get_json()['duplicate'] is True
+    assert bag_rows(app, token) == 1
+    assert [kind for kind, _ in app.sent_mail].count('submitted') == 1
+
+
+def test_replay_after_a_later_revision(app, client, new_link):
+    token = new_link()
+    assert submit(client, token, key='key-1').status_code == 200
+    edited = [dict(BAGS[0], tubesheet_dia='170')]
+    assert submit(client, token, bags=edited, key='key-2').get_json()['revision'] == 2
+
+    response = submit(client, token, key='key-1')
+    assert response.get_json()['duplicate'] is True
+    with app.app_context():
+        parent = FilterBagSubmission.query.filter_by(token=token).order_by(FilterBagSubmission.id).first()
+        assert parent.current_revision == 2
+
+
+def test_second_submit_with_other_key_and_same_bags_changes_nothing(app, client, new_link):
+    token = new_link()
+    assert submit(client, token, key='key-1').status_code == 200
+
+    response = submit(client, token, key='key-2')
+    assert response.status_code == 200
+    assert response.get_json()['unchanged'] is True
+    assert bag_rows(app, token) == 1
+
+
+def test_concurrent_submit_with_same_key_is_replayed(app, client, new_link, meanwhile):
+    token = new_link()
+    meanwhile(token, submitted=True, idempotency_key='key-1', current_revision=1)
+
+    response = submit(client, token, key='key-1')
+    assert response.status_code == 200
+    assert response.get_json()['duplicate'] is True
+    assert bag_rows(app, token) == 0
+    assert 'submitted' not in [kind for kind, _ in app.sent_mail]
+
+
+def test_concurrent_submit_with_other_key_loses_the_claim(app, client, new_link, meanwhile):
+    token = new_link()
+    meanwhile(token, submitted=True, idempotency_key='key-1', current_revision=1)
+
+    response = submit(client, token, key='key-2')
+    assert response.status_code == 409
+    assert bag_rows(app, token) == 0
+    assert 'submitted' not in [kind for kind, _ in app.sent_mail]
+
+
+def test_stale_revision_is_rejected(app, client, new_link, meanwhile):
+    token = new_link()
+    assert submit(client, token).status_code == 200
+    meanwhile(token, current_revision=2)
+
+    response = submit(client, token, bags=[dict(BAGS[0], tubesheet_dia='170')])
+    assert response.status_code == 409
+    with app.app_context():
+        row = FilterBagSubmission.query.filter(
+            FilterBagSubmission.token == token, FilterBagSubmission.bag_type.isnot(None)
+        ).one()
+        assert row.tubesheet_dia == '160'